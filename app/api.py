@@ -1,26 +1,159 @@
-from fastapi import FastAPI
-from app.schemas import AskRequest, Source
-from app.guardrails import emergency_flag, DISCLAIMER, instruction_prompt
-from app.rag import retriever_singleton, format_context, synthesize_answer
+import json, os, time
+from fastapi import FastAPI, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from typing import AsyncIterator, Dict, List, Optional
+from app import metrics
+from app.metrics import Counter, Gauge, Histogram, SIZE_BUCKETS, collect, stage
+from app.schemas import AskRequest, AskBatchRequest
+from app.batching import MicroBatcher
+from app.embed_cache import normalize_query
+from app.response_cache import cache_key, make_cache
+from app.guardrails import DISCLAIMER, instruction_prompt
+from app.rag import (current_retriever, get_retriever, readiness, warm_up, watch_corpus,
+                     synthesize_answer)
 from app.stt_tts import dummy_tts
-from app.condition_links import find_condition_pages, extract_symptoms_from_pages, get_disease_summary
+from app.condition_links import condition_pages_for, extract_symptoms_from_pages, disease_summary_for
+from app.query_analysis import QueryAnalysis, analyze_query
+
+WARMUP_ON_START = os.getenv("WARMUP_ON_START", "1") == "1"
+CORPUS_POLL_S = float(os.getenv("CORPUS_POLL_S", "30"))  # 0 = only pick up new corpora on restart
 
 app = FastAPI(title="Medical RAG Voice Assistant", version="0.1.0")
 
+def _retrieve_batch(items) -> list:
+    BATCH_SIZE.observe(len(items))
+    with collect() as timings:
+        all_docs = get_retriever().retrieve_batch([q for q, _ in items], [k for _, k in items])
+    timings["batch_size"] = len(items)
+    return [(docs, timings) for docs in all_docs]
+
+# concurrent /ask requests share one encode + index search per batch
+batcher = MicroBatcher(_retrieve_batch)
+
+# answers keyed on (query, top_k, voice, corpus version)
+response_cache = make_cache()
+
+def _cache_stat(key: str) -> float:
+    r = current_retriever()
+    return r.query_cache.stats()[key] if r is not None else 0
+
+BATCH_SIZE = Histogram("rag_batch_size", "Queries per micro-batch", buckets=SIZE_BUCKETS)
+Gauge("rag_batch_queue_depth", "Requests waiting for the next micro-batch", fn=lambda: batcher.stats()["queue_depth"])
+Gauge("rag_ready", "1 once the retriever can serve", fn=lambda: int(current_retriever() is not None))
+Gauge("rag_corpus_chunks", "Chunks in the served corpus", fn=lambda: readiness()["chunks"])
+Counter("rag_query_cache_hits_total", "Query vectors served from cache", fn=lambda: _cache_stat("hits"))
+Counter("rag_query_cache_misses_total", "Query vectors that needed the model", fn=lambda: _cache_stat("misses"))
+Gauge("rag_query_cache_size", "Query vectors cached", fn=lambda: _cache_stat("size"))
+if response_cache is not None:
+    Counter("rag_response_cache_hits_total", "/ask answers served from the response cache",
+            fn=lambda: response_cache.hits + response_cache.coalesced)
+    Counter("rag_response_cache_misses_total", "/ask answers computed", fn=lambda: response_cache.misses)
+    Gauge("rag_response_cache_size", "Cached /ask answers", fn=lambda: len(response_cache.backend))
+
+@app.middleware("http")
+async def _count_requests(request: Request, call_next):
+    t0 = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    path = route.path if route is not None else "other"  # templated path, bounded cardinality
+    metrics.REQUESTS.inc(route=path, method=request.method, status=response.status_code)
+    metrics.REQUEST_SECONDS.observe(time.perf_counter() - t0, route=path)
+    return response
+
+@app.on_event("startup")
+def _start_warmup():
+    # load the model and index in the background; requests before then wait for it
+    if WARMUP_ON_START:
+        warm_up()
+    if CORPUS_POLL_S > 0:
+        watch_corpus(CORPUS_POLL_S)
+
+@app.on_event("shutdown")
+async def _stop_batcher():
+    await batcher.close()
+
 @app.get("/health")
+@app.get("/health/live")
 def health():
     return {"status": "ok"}
 
+@app.get("/health/ready")
+def health_ready(response: Response):
+    status = readiness()
+    if not status["ready"]:
+        response.status_code = 503
+    return status
+
+@app.get("/stats")
+def stats():
+    status = readiness()
+    return {"batcher": batcher.stats(),
+            "query_cache": get_retriever().query_cache.stats() if status["ready"] else None,
+            "response_cache": response_cache.stats() if response_cache is not None else None}
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+def _debug(timings: Dict[str, float], batch: Optional[Dict] = None) -> dict:
+    out = dict(timings)
+    for key, v in (batch or {}).items():
+        if key != "batch_size":
+            out[f"retrieve.{key}"] = v  # shared by every request in the micro-batch
+    return {"timings_ms": out, "batch_size": (batch or {}).get("batch_size", 1)}
+
+async def _ask(req: AskRequest) -> dict:
+    with collect() as timings:
+        qa = analyze_query(req.query)
+        with stage("retrieve"):
+            docs, batch_timings = await batcher.submit((req.query, req.top_k))
+        out = _answer(req, qa, docs)
+        if req.voice:  # keep the event loop (and the micro-batcher) free while speaking
+            out["audio_b64"] = await run_in_threadpool(_timed_tts, out["answer"])
+    if req.debug:
+        out["debug"] = _debug(timings, batch_timings)
+    return out
+
 @app.post("/ask")
-def ask(req: AskRequest):
-    emerg = emergency_flag(req.query)
-    safety = {"disclaimer": DISCLAIMER, "emergency": emerg}
+async def ask(req: AskRequest):
+    r = current_retriever()
+    # debug asks for fresh timings; while warming up there is no corpus version yet
+    if response_cache is None or req.debug or r is None:
+        return await _ask(req)
+    key = cache_key(r.version, normalize_query(req.query), req.top_k, req.voice)
+    out, _hit = await response_cache.get_or_compute(r.version, key, lambda: _ask(req))
+    return out
 
-    docs = retriever_singleton.retrieve(req.query, k=req.top_k)
-    system = instruction_prompt()
-    _ = format_context(docs)
-    answer = synthesize_answer(req.query, docs, system)
+@app.post("/ask_batch")
+def ask_batch(batch: AskBatchRequest) -> List[dict]:
+    reqs = batch.requests
+    with collect() as batch_timings:
+        all_docs = get_retriever().retrieve_batch([r.query for r in reqs], [r.top_k for r in reqs])
+    batch_timings["batch_size"] = len(reqs)
+    results = []
+    for r, docs in zip(reqs, all_docs):
+        with collect() as timings:
+            out = _answer(r, analyze_query(r.query), docs)
+            if r.voice:
+                out["audio_b64"] = _timed_tts(out["answer"])
+        if r.debug:
+            out["debug"] = _debug(timings, batch_timings)
+        results.append(out)
+    return results
+
+def _early(qa: QueryAnalysis) -> dict:
+    """Everything that only needs the keyword lookups, no retrieval."""
+    with stage("condition_lookup"):
+        return {
+            "safety": {"disclaimer": DISCLAIMER, "emergency": qa.emergency},
+            # NEW: condition pages (MedlinePlus + CDC)
+            "condition_pages": condition_pages_for(qa.disease_key),
+            # NEW: disease summary from MedlinePlus
+            "disease_summary": disease_summary_for(qa.disease_key),
+        }
 
+def _sources(docs) -> List[dict]:
     # Build sources from retrieved docs
     sources = []
     for d in docs[:4]:
@@ -30,30 +163,69 @@ def ask(req: AskRequest):
             "url": m.get("source", ""), 
             "chunk_id": m.get("chunk_id", -1)
         })
+    return sources
 
-    # NEW: condition pages (MedlinePlus + CDC)
-    condition_pages = find_condition_pages(req.query)
-    
-    # NEW: disease summary from MedlinePlus
-    disease_summary = get_disease_summary(req.query)
+def _answer_text(req: AskRequest, docs, condition_pages) -> str:
+    system = instruction_prompt()
+    with stage("synthesize"):
+        answer = synthesize_answer(req.query, docs, system)
 
     if condition_pages:
         symptoms = extract_symptoms_from_pages(condition_pages)
         if symptoms:
             bullets = "\n".join(f"- {s}" for s in symptoms[:6])
             answer = f"**Symptoms (from reputable sources):**\n{bullets}\n\n{answer}"
+    return answer
+
+def _answer(req: AskRequest, qa: QueryAnalysis, docs) -> dict:
+    """The response without audio; callers add audio_b64 via _timed_tts when req.voice is set."""
+    early = _early(qa)
+    answer = _answer_text(req, docs, early["condition_pages"])
 
-    audio_b64 = dummy_tts(answer) if req.voice else None
-    
     return {
         "answer": answer,
-        "sources": sources,
-        "safety": safety,
-        "audio_b64": audio_b64,
-        "condition_pages": condition_pages,
-        "disease_summary": disease_summary
+        "sources": _sources(docs),
+        "safety": early["safety"],
+        "audio_b64": None,
+        "condition_pages": early["condition_pages"],
+        "disease_summary": early["disease_summary"]
     }
 
+def _timed_tts(answer: str) -> str:
+    with stage("tts"):
+        return dummy_tts(answer)
+
+async def _ask_events(req: AskRequest) -> AsyncIterator[str]:
+    def line(event: str, **data) -> str:
+        return json.dumps({"event": event, **data}) + "\n"
+
+    timings: Dict[str, float] = {}
+    with collect(timings):
+        qa = analyze_query(req.query)
+        early = _early(qa)
+    yield line("safety", **early)
+    try:
+        with collect(timings), stage("retrieve"):
+            docs, batch_timings = await batcher.submit((req.query, req.top_k))
+    except Exception as e:
+        yield line("error", detail=str(e))
+        return
+    yield line("sources", sources=_sources(docs))
+    with collect(timings):
+        answer = _answer_text(req, docs, early["condition_pages"])
+    yield line("answer", answer=answer)
+    if req.voice:
+        t0 = time.perf_counter()
+        audio_b64 = await run_in_threadpool(_timed_tts, answer)
+        timings["tts"] = round((time.perf_counter() - t0) * 1000.0, 3)
+        yield line("audio", audio_b64=audio_b64)
+    yield line("done", **({"debug": _debug(timings, batch_timings)} if req.debug else {}))
+
+@app.post("/ask/stream")
+async def ask_stream(req: AskRequest):
+    """Same content as /ask as NDJSON events: safety (+ condition data), sources, answer, audio, done."""
+    return StreamingResponse(_ask_events(req), media_type="application/x-ndjson")
+
 @app.get("/")
 def root():
     return {
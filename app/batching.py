@@ -0,0 +1,101 @@
+# app/batching.py
+"""
+Micro-batching for the async request path: items submitted within BATCH_WINDOW_MS
+of each other (up to BATCH_MAX_SIZE) go to the model in one call, run off the
+event loop, and each caller gets its own row back.
+"""
+import asyncio, os
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+BATCH_WINDOW_MS = float(os.getenv("BATCH_WINDOW_MS", "5"))
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "32"))
+
+class MicroBatcher:
+    """
+    Coalesces concurrent `submit(item)` calls into `fn(items)` calls.
+    `fn` is synchronous, runs in the default executor and returns one result per item.
+    Batches run one at a time, so requests arriving during a model call form the next batch.
+    """
+
+    def __init__(self, fn: Callable[[List[Any]], Sequence[Any]],
+                 window_ms: float = BATCH_WINDOW_MS, max_size: int = BATCH_MAX_SIZE):
+        self.fn = fn
+        self.window_s = max(0.0, window_ms) / 1000.0
+        self.max_size = max(1, max_size)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.items = 0
+        self.peak_depth = 0
+        self.sizes: Counter = Counter()
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run())
+
+    async def submit(self, item: Any) -> Any:
+        self._ensure_started()
+        fut = self._loop.create_future()
+        self._queue.put_nowait((item, fut))
+        self.peak_depth = max(self.peak_depth, self._queue.qsize())
+        return await fut
+
+    async def _collect(self) -> list:
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.window_s
+        while len(batch) < self.max_size:
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        while len(batch) < self.max_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return [(item, fut) for item, fut in batch if not fut.done()]  # drop cancelled callers
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            if not batch:
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            self.sizes[len(batch)] += 1
+            try:
+                results = await self._loop.run_in_executor(None, self.fn, [item for item, _ in batch])
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            for (_, fut), res in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(res)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "peak_queue_depth": self.peak_depth,
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "batch_sizes": dict(sorted(self.sizes.items())),
+            "window_ms": self.window_s * 1000.0,
+            "max_size": self.max_size,
+        }
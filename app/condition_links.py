@@ -1,330 +1,158 @@
 # app/condition_links.py
-import re
-from typing import List, Dict, Optional
+import json, os, re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
-# Comprehensive medical conditions database
-DISEASES = {
-    # Common diseases
-    "flu": {
-        "keywords": ["flu", "influenza", "seasonal flu"],
-        "condition": "Influenza (Flu)",
-        "overview": "A viral infection that attacks the respiratory system.",
-        "symptoms": "Fever, muscle aches, chills, fatigue, cough, headache, runny nose, sore throat",
-        "causes": "Influenza viruses spread through droplets",
-        "treatment": "Rest, fluids, antiviral medications, pain relievers",
-        "prevention": "Annual flu vaccination, frequent handwashing",
-        "links": [
-            {"provider": "MedlinePlus", "title": "Flu - MedlinePlus", "url": "https://medlineplus.gov/flu.html"},
-            {"provider": "CDC", "title": "Flu - CDC", "url": "https://www.cdc.gov/flu/"}
-        ]
-    },
-    "covid19": {
-        "keywords": ["covid", "covid-19", "coronavirus", "sars-cov-2"],
-        "condition": "COVID-19",
-        "overview": "A respiratory illness caused by the SARS-CoV-2 virus.",
-        "symptoms": "Fever, cough, shortness of breath, fatigue, body aches, loss of taste or smell",
-        "causes": "SARS-CoV-2 virus spread through respiratory droplets and airborne transmission",
-        "treatment": "Rest, fluids, medications for symptoms, antiviral drugs in severe cases",
-        "prevention": "Vaccination, mask wearing, social distancing, good hygiene",
-        "links": [
-            {"provider": "MedlinePlus", "title": "COVID-19 - MedlinePlus", "url": "https://medlineplus.gov/covid19coronavirusdisease2019.html"},
-            {"provider": "CDC", "title": "COVID-19 - CDC", "url": "https://www.cdc.gov/coronavirus/2019-ncov/"}
-        ]
-    },
-    "common_cold": {
-        "keywords": ["common cold", "cold symptoms", "runny nose", "stuffy nose", "sniffles"],
-        "condition": "Common Cold",
-        "overview": "A viral infection of the upper respiratory tract.",
-        "symptoms": "Runny nose, stuffy nose, sneezing, cough, sore throat, mild headache",
-        "causes": "Viruses, especially rhinoviruses, spread through droplets",
-        "treatment": "Rest, fluids, over-the-counter medications for symptoms",
-        "prevention": "Frequent handwashing, avoid close contact with sick people",
-        "links": [
-            {"provider": "MedlinePlus", "title": "Common Cold - MedlinePlus", "url": "https://medlineplus.gov/commoncold.html"}
-        ]
-    },
-    "diabetes": {
-        "keywords": ["diabetes", "diabetic", "blood sugar", "insulin", "glucose"],
-        "condition": "Diabetes",
-        "overview": "A group of diseases that result in too much sugar in the blood.",
-        "symptoms": "Increased thirst, frequent urination, hunger, fatigue, blurred vision",
-        "causes": "Type 1: Immune system destroys insulin cells. Type 2: Insulin resistance",
-        "treatment": "Insulin therapy, medications, blood sugar monitoring, diet, exercise",
-        "prevention": "Maintain healthy weight, eat healthy foods, stay active",
-        "links": [
-            {"provider": "MedlinePlus", "title": "Diabetes - MedlinePlus", "url": "https://medlineplus.gov/diabetes.html"},
-            {"provider": "CDC", "title": "Diabetes - CDC", "url": "https://www.cdc.gov/diabetes/"}
-        ]
-    },
-    "hypertension": {
-        "keywords": ["hypertension", "high blood pressure"],
-        "condition": "High Blood Pressure",
-        "overview": "A condition where blood force against artery walls is too high.",
-        "symptoms": "Often no symptoms, headaches, shortness of breath, nosebleeds",
-        "causes": "Age, family history, obesity, lack of activity, too much salt",
-        "treatment": "Lifestyle changes, medications, regular monitoring",
-        "prevention": "Healthy diet, regular exercise, maintain healthy weight",
-        "links": [
-            {"provider": "MedlinePlus", "title": "High Blood Pressure - MedlinePlus", "url": "https://medlineplus.gov/highbloodpressure.html"},
-            {"provider": "CDC", "title": "High Blood Pressure - CDC", "url": "https://www.cdc.gov/bloodpressure/"}
-        ]
-    },
-    "hypotension": {
-        "keywords": ["low blood pressure", "hypotension"],
-        "condition": "Low Blood Pressure",
-        "overview": "A condition where blood pressure is lower than normal.",
-        "symptoms": "Dizziness, fainting, fatigue, nausea, blurred vision",
-        "causes": "Dehydration, heart problems, medications, severe infection",
-        "treatment": "Increase fluid intake, medications, treat underlying causes",
-        "prevention": "Stay hydrated, avoid sudden position changes, eat small frequent meals",
-        "links": [
-            {"provider": "MedlinePlus", "title": "Low Blood Pressure - MedlinePlus", "url": "https://medlineplus.gov/lowbloodpressure.html"}
-        ]
-    },
-    "heart_disease": {
-        "keywords": ["heart disease", "cardiac", "coronary", "heart attack", "chest pain", "heart pain", "heart ache", "angina"],
-        "condition": "Heart Disease",
-        "overview": "A range of conditions that affect the heart.",
-        "symptoms": "Chest pain, shortness of breath, fatigue, irregular heartbeat",
-        "causes": "High blood pressure, high cholesterol, smoking, diabetes, obesity",
-        "treatment": "Medications, lifestyle changes, procedures",
-        "prevention": "Healthy diet, regular exercise, don't smoke",
-        "links": [
-            {"provider": "MedlinePlus", "title": "Heart Disease - MedlinePlus", "url": "https://medlineplus.gov/heartdiseases.html"},
-            {"provider": "CDC", "title": "Heart Disease - CDC", "url": "https://www.cdc.gov/heartdisease/"}
-        ]
-    },
-    
-    # Brain conditions
-    "stroke": {
-        "keywords": ["stroke", "brain attack", "cerebrovascular accident"],
-        "condition": "Stroke",
-        "overview": "Occurs when blood supply to brain is interrupted or reduced.",
-        "symptoms": "Sudden numbness, confusion, trouble speaking, severe headache",
-        "causes": "Blood clots, bleeding in brain, high blood pressure",
-        "treatment": "Emergency care, clot-busting drugs, surgery, rehabilitation",
-        "prevention": "Control blood pressure, don't smoke, exercise regularly",
-        "links": [
-            {"provider": "MedlinePlus", "title": "Stroke - MedlinePlus", "url": "https://medlineplus.gov/stroke.html"},
-            {"provider": "CDC", "title": "Stroke - CDC", "url": "https://www.cdc.gov/stroke/"}
-        ]
-    },
-    "brain_tumor": {
-        "keywords": ["brain tumor", "brain cancer", "brain mass"],
-        "condition": "Brain Tumor",
-        "overview": "Abnormal growth of cells in the brain.",
-        "symptoms": "Headaches, seizures, vision problems, memory issues, personality changes",
-        "causes": "Unknown in most cases, genetic factors, radiation exposure",
-        "treatment": "Surgery, radiation therapy, chemotherapy, targeted therapy",
-        "prevention": "Avoid radiation exposure, healthy lifestyle",
-        "links": [
-            {"provider": "MedlinePlus", "title": "Brain Tumors - MedlinePlus", "url": "https://medlineplus.gov/braintumors.html"}
-        ]
-    },
-    "migraine": {
-        "keywords": ["migraine", "severe headache", "headache"],
-        "condition": "Migraine",
-        "overview": "A neurological condition causing severe throbbing pain.",
-        "symptoms": "Severe headache, nausea, vomiting, sensitivity to light",
-        "causes": "Genetics, hormonal changes, stress, certain foods",
-        "treatment": "Pain medications, preventive medications, lifestyle changes",
-        "prevention": "Identify triggers, regular sleep, stress management",
-        "links": [
-            {"provider": "MedlinePlus", "title": "Migraine - MedlinePlus", "url": "https://medlineplus.gov/migraine.html"}
-        ]
-    },
-    
-    # Muscle and pain conditions
-    "muscle_ache": {
-        "keywords": ["muscle ache", "muscle pain", "myalgia", "sore muscles"],
-        "condition": "Muscle Aches",
-        "overview": "Pain or discomfort in muscles throughout the body.",
-        "symptoms": "Muscle pain, stiffness, tenderness, weakness",
-        "causes": "Exercise, stress, infections, medications, autoimmune conditions",
-        "treatment": "Rest, ice/heat, pain relievers, gentle stretching, massage",
-        "prevention": "Proper warm-up, gradual exercise increase, stay hydrated",
-        "links": [
-            {"provider": "MedlinePlus", "title": "Muscle Cramps - MedlinePlus", "url": "https://medlineplus.gov/musclecramps.html"}
-        ]
-    },
-    
-    # Hormonal conditions
-    "hormonal_imbalance": {
-        "keywords": ["hormonal imbalance", "hormone imbalance", "endocrine disorder"],
-        "condition": "Hormonal Imbalance",
-        "overview": "When there's too much or too little of a hormone in the bloodstream.",
-        "symptoms": "Irregular periods, weight changes, mood swings, fatigue, hair loss",
-        "causes": "Age, stress, medications, medical conditions, lifestyle factors",
-        "treatment": "Hormone therapy, lifestyle changes, medications, dietary changes",
-        "prevention": "Healthy diet, regular exercise, stress management, adequate sleep",
-        "links": [
-            {"provider": "MedlinePlus", "title": "Hormones - MedlinePlus", "url": "https://medlineplus.gov/hormones.html"}
-        ]
-    },
-    
-    # Nose conditions
-    "nosebleed": {
-        "keywords": ["nosebleed", "nose bleed", "epistaxis", "bloody nose"],
-        "condition": "Nosebleed",
-        "overview": "Bleeding from the nose, usually from blood vessels in the nasal septum.",
-        "symptoms": "Blood flowing from one or both nostrils",
-        "causes": "Dry air, nose picking, allergies, medications, high blood pressure",
-        "treatment": "Pinch nose, lean forward, apply ice, nasal sprays",
-        "prevention": "Use humidifier, avoid nose picking, treat allergies",
-        "links": [
-            {"provider": "MedlinePlus", "title": "Nosebleeds - MedlinePlus", "url": "https://medlineplus.gov/nosebleeds.html"}
-        ]
-    },
-    
-    # Different types of cancer
-    "breast_cancer": {
-        "keywords": ["breast cancer", "breast tumor", "breast lump"],
-        "condition": "Breast Cancer",
-        "overview": "Cancer that forms in tissues of the breast.",
-        "symptoms": "Breast lump, breast pain, nipple discharge, changes in breast size",
-        "causes": "Age, genetics, family history, hormones, lifestyle factors",
-        "treatment": "Surgery, chemotherapy, radiation therapy, hormone therapy",
-        "prevention": "Regular screening, healthy lifestyle, limit alcohol",
-        "links": [
-            {"provider": "MedlinePlus", "title": "Breast Cancer - MedlinePlus", "url": "https://medlineplus.gov/breastcancer.html"},
-            {"provider": "CDC", "title": "Breast Cancer - CDC", "url": "https://www.cdc.gov/cancer/breast/"}
-        ]
-    },
-    "lung_cancer": {
-        "keywords": ["lung cancer", "lung tumor", "lung carcinoma"],
-        "condition": "Lung Cancer",
-        "overview": "Cancer that begins in the lungs.",
-        "symptoms": "Persistent cough, chest pain, shortness of breath, coughing up blood",
-        "causes": "Smoking, secondhand smoke, radon, asbestos, air pollution",
-        "treatment": "Surgery, chemotherapy, radiation therapy, targeted therapy",
-        "prevention": "Don't smoke, avoid secondhand smoke, test home for radon",
-        "links": [
-            {"provider": "MedlinePlus", "title": "Lung Cancer - MedlinePlus", "url": "https://medlineplus.gov/lungcancer.html"},
-            {"provider": "CDC", "title": "Lung Cancer - CDC", "url": "https://www.cdc.gov/cancer/lung/"}
-        ]
-    },
-    "colon_cancer": {
-        "keywords": ["colon cancer", "colorectal cancer", "bowel cancer"],
-        "condition": "Colon Cancer",
-        "overview": "Cancer that begins in the large intestine (colon).",
-        "symptoms": "Changes in bowel habits, blood in stool, abdominal pain, weight loss",
-        "causes": "Age, family history, inflammatory bowel disease, diet, lifestyle",
-        "treatment": "Surgery, chemotherapy, radiation therapy, targeted therapy",
-        "prevention": "Regular screening, healthy diet, exercise, limit alcohol",
-        "links": [
-            {"provider": "MedlinePlus", "title": "Colorectal Cancer - MedlinePlus", "url": "https://medlineplus.gov/colorectalcancer.html"},
-            {"provider": "CDC", "title": "Colorectal Cancer - CDC", "url": "https://www.cdc.gov/cancer/colorectal/"}
-        ]
-    },
-    "prostate_cancer": {
-        "keywords": ["prostate cancer", "prostate tumor"],
-        "condition": "Prostate Cancer",
-        "overview": "Cancer that occurs in the prostate gland in men.",
-        "symptoms": "Difficulty urinating, blood in urine, pelvic discomfort",
-        "causes": "Age, race, family history, obesity",
-        "treatment": "Surgery, radiation therapy, hormone therapy, chemotherapy",
-        "prevention": "Healthy diet, regular exercise, maintain healthy weight",
-        "links": [
-            {"provider": "MedlinePlus", "title": "Prostate Cancer - MedlinePlus", "url": "https://medlineplus.gov/prostatecancer.html"},
-            {"provider": "CDC", "title": "Prostate Cancer - CDC", "url": "https://www.cdc.gov/cancer/prostate/"}
-        ]
-    },
-    "skin_cancer": {
-        "keywords": ["skin cancer", "melanoma", "basal cell carcinoma", "squamous cell carcinoma"],
-        "condition": "Skin Cancer",
-        "overview": "Cancer that begins in the skin.",
-        "symptoms": "New growths, changes in existing moles, sores that don't heal",
-        "causes": "UV radiation from sun or tanning beds, fair skin, family history",
-        "treatment": "Surgery, radiation therapy, chemotherapy, immunotherapy",
-        "prevention": "Use sunscreen, avoid tanning beds, wear protective clothing",
-        "links": [
-            {"provider": "MedlinePlus", "title": "Skin Cancer - MedlinePlus", "url": "https://medlineplus.gov/skincancer.html"},
-            {"provider": "CDC", "title": "Skin Cancer - CDC", "url": "https://www.cdc.gov/cancer/skin/"}
-        ]
-    },
-    "ovarian_cancer": {
-        "keywords": ["ovarian cancer", "ovary cancer"],
-        "condition": "Ovarian Cancer",
-        "overview": "Cancer that begins in the ovaries.",
-        "symptoms": "Abdominal bloating, pelvic pain, difficulty eating, urinary urgency",
-        "causes": "Age, genetics, family history, reproductive history",
-        "treatment": "Surgery, chemotherapy, targeted therapy",
-        "prevention": "Birth control pills, pregnancy, breastfeeding may reduce risk",
-        "links": [
-            {"provider": "MedlinePlus", "title": "Ovarian Cancer - MedlinePlus", "url": "https://medlineplus.gov/ovariancancer.html"},
-            {"provider": "CDC", "title": "Ovarian Cancer - CDC", "url": "https://www.cdc.gov/cancer/ovarian/"}
-        ]
-    },
-    "cervical_cancer": {
-        "keywords": ["cervical cancer", "cervix cancer"],
-        "condition": "Cervical Cancer",
-        "overview": "Cancer that occurs in the cells of the cervix.",
-        "symptoms": "Vaginal bleeding, pelvic pain, pain during intercourse",
-        "causes": "HPV infection, smoking, weakened immune system",
-        "treatment": "Surgery, radiation therapy, chemotherapy",
-        "prevention": "HPV vaccination, regular Pap tests, safe sex practices",
-        "links": [
-            {"provider": "MedlinePlus", "title": "Cervical Cancer - MedlinePlus", "url": "https://medlineplus.gov/cervicalcancer.html"},
-            {"provider": "CDC", "title": "Cervical Cancer - CDC", "url": "https://www.cdc.gov/cancer/cervical/"}
-        ]
-    },
-    "pancreatic_cancer": {
-        "keywords": ["pancreatic cancer", "pancreas cancer"],
-        "condition": "Pancreatic Cancer",
-        "overview": "Cancer that begins in the pancreas.",
-        "symptoms": "Abdominal pain, weight loss, jaundice, new-onset diabetes",
-        "causes": "Smoking, obesity, diabetes, family history, age",
-        "treatment": "Surgery, chemotherapy, radiation therapy, targeted therapy",
-        "prevention": "Don't smoke, maintain healthy weight, limit alcohol",
-        "links": [
-            {"provider": "MedlinePlus", "title": "Pancreatic Cancer - MedlinePlus", "url": "https://medlineplus.gov/pancreaticcancer.html"},
-            {"provider": "CDC", "title": "Pancreatic Cancer - CDC", "url": "https://www.cdc.gov/cancer/pancreatic/"}
-        ]
-    },
-    "liver_cancer": {
-        "keywords": ["liver cancer", "hepatocellular carcinoma"],
-        "condition": "Liver Cancer",
-        "overview": "Cancer that begins in the liver.",
-        "symptoms": "Weight loss, upper abdominal pain, nausea, jaundice",
-        "causes": "Hepatitis B/C, cirrhosis, alcohol abuse, obesity",
-        "treatment": "Surgery, liver transplant, chemotherapy, targeted therapy",
-        "prevention": "Hepatitis B vaccination, limit alcohol, maintain healthy weight",
-        "links": [
-            {"provider": "MedlinePlus", "title": "Liver Cancer - MedlinePlus", "url": "https://medlineplus.gov/livercancer.html"},
-            {"provider": "CDC", "title": "Liver Cancer - CDC", "url": "https://www.cdc.gov/cancer/liver/"}
-        ]
-    }
-}
+CONDITIONS_PATH = os.getenv(
+    "CONDITIONS_PATH", os.path.join(os.path.dirname(__file__), "data", "conditions.json"))
+FUZZY_MIN_LEN = 7  # six letters or fewer: real words sit one edit apart ("strike", "stoke" ~ "stroke")
+FUZZY_MAX_EDITS = 1  # two edits reach ordinary words ("influence" ~ "influenza", "hard attack" ~ "heart attack")
+FUZZY_MAX_POSTINGS = 256  # trigram buckets larger than this are too common to narrow anything down
+FUZZY_MIN_OVERLAP = 0.4   # share of the phrase's trigrams a candidate keyword must contain
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_TEXT_FIELDS = ("condition", "overview", "symptoms", "causes", "treatment", "prevention")
+
+def tokenize(text_lower: str) -> List[str]:
+    return _TOKEN_RE.findall(text_lower)
+
+def _trigrams(s: str) -> set:
+    s = f"  {s} "
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, giving up early once every cell exceeds `limit`."""
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(cur) > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1]
+
+def _edit_limit(n: int) -> int:
+    return 0 if n < FUZZY_MIN_LEN else FUZZY_MAX_EDITS
+
+def load_conditions(path: str = CONDITIONS_PATH) -> Dict[str, Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+class ConditionKB:
+    """
+    Keyword lookup over the conditions database.
+
+    Exact matching walks a token trie from each query position, so cost depends on
+    query length and the longest keyword, not on how many conditions there are.
+    When nothing matches exactly, a character-trigram index proposes keywords
+    close to the query's words ("diabetis" -> "diabetes"), confirmed by edit distance.
+    Postings are bucketed by first letter and keyword length and over-full buckets are
+    skipped, so a lookup reads a bounded number of candidates however large the KB grows.
+    Phrases made only of known words (the conditions' own descriptions plus any corpus
+    vocabulary added later) are real text, not typos, and are never corrected.
+    Ties keep the old rule: the condition with the longest keyword wins.
+    """
+
+    def __init__(self, conditions: Dict[str, Dict], vocabulary: Iterable[str] = ()):
+        self.conditions = conditions
+        self.known_words = set(vocabulary)
+        for data in conditions.values():
+            for field in _TEXT_FIELDS:
+                self.known_words.update(tokenize(str(data.get(field, "")).lower()))
+        # longest keyword first to avoid partial matches
+        ordered = sorted(conditions, key=lambda k: max(len(kw) for kw in conditions[k]["keywords"]), reverse=True)
+        self._rank = {key: i for i, key in enumerate(ordered)}
+        self._trie: Dict = {}
+        self._keywords: List[Tuple[str, str]] = []  # (joined keyword tokens, disease key)
+        self._by_trigram: Dict[Tuple[str, int, str], List[int]] = defaultdict(list)  # (first, len, gram)
+        for key in ordered:
+            for kw in conditions[key]["keywords"]:
+                toks = tokenize(kw.lower())
+                if not toks:
+                    continue
+                node = self._trie
+                for t in toks:
+                    node = node.setdefault(t, {})
+                node.setdefault(None, key)  # first (highest priority) owner keeps the keyword
+                joined = " ".join(toks)
+                kid = len(self._keywords)
+                self._keywords.append((joined, key))
+                for g in _trigrams(joined):
+                    self._by_trigram[(joined[0], len(joined), g)].append(kid)
+
+    def add_vocabulary(self, words: Iterable[str]):
+        self.known_words.update(words)
+
+    def _best(self, keys) -> Optional[str]:
+        return min(keys, key=self._rank.__getitem__, default=None)
+
+    def match_exact(self, tokens: Sequence[str]) -> Optional[str]:
+        found = []
+        for i in range(len(tokens)):
+            node = self._trie
+            for t in tokens[i:]:
+                node = node.get(t)
+                if node is None:
+                    break
+                if None in node:
+                    found.append(node[None])
+        return self._best(found)
+
+    def match_fuzzy(self, tokens: Sequence[str], max_ngram: int = 3) -> Optional[str]:
+        found = []
+        for i in range(len(tokens)):
+            for n in range(1, max_ngram + 1):
+                if i + n > len(tokens):
+                    break
+                phrase = " ".join(tokens[i:i + n])
+                limit = _edit_limit(len(phrase))
+                if limit == 0 or all(t in self.known_words for t in tokens[i:i + n]):
+                    continue  # exact matching already had its chance
+                grams = _trigrams(phrase)
+                shared = defaultdict(int)
+                for length in range(len(phrase) - limit, len(phrase) + limit + 1):
+                    for g in grams:
+                        posting = self._by_trigram.get((phrase[0], length, g))
+                        if posting is None or len(posting) > FUZZY_MAX_POSTINGS:
+                            continue
+                        for kid in posting:
+                            shared[kid] += 1
+                need = max(2, FUZZY_MIN_OVERLAP * len(grams))
+                for kid, count in shared.items():
+                    kw, key = self._keywords[kid]
+                    if count >= need and _edit_distance(phrase, kw, limit) <= limit:
+                        found.append(key)
+        return self._best(found)
+
+    def match(self, tokens: Sequence[str]) -> Optional[str]:
+        return self.match_exact(tokens) or self.match_fuzzy(tokens)
+
+# Comprehensive medical conditions database, loaded from CONDITIONS_PATH
+DISEASES = load_conditions()
+KB = ConditionKB(DISEASES)
+
+def add_known_words(words: Iterable[str]):
+    """Register corpus vocabulary so real words in queries are not typo-corrected into conditions."""
+    KB.add_vocabulary(words)
+
+def match_disease_tokens(tokens: Sequence[str]) -> Optional[str]:
+    return KB.match(tokens)
+
+def match_disease(text_lower: str) -> Optional[str]:
+    """Disease key for text that is already lowercased"""
+    return KB.match(tokenize(text_lower))
 
 def _find_matching_disease(query: str) -> Optional[str]:
     """Find disease that matches query keywords with exact matching"""
-    query_lower = query.lower()
-    
-    # Sort diseases by keyword length (longest first) to avoid partial matches
-    diseases_sorted = sorted(DISEASES.items(), key=lambda x: max(len(kw) for kw in x[1]["keywords"]), reverse=True)
-    
-    for disease_key, disease_data in diseases_sorted:
-        for keyword in disease_data["keywords"]:
-            # Use word boundaries for exact matching
-            pattern = r'\b' + re.escape(keyword) + r'\b'
-            if re.search(pattern, query_lower):
-                return disease_key
-    
-    return None
+    return match_disease(query.lower())
 
-def find_condition_pages(query: str) -> List[Dict[str, str]]:
-    """Find condition pages with correct direct links"""
-    disease_key = _find_matching_disease(query)
-    
+def condition_pages_for(disease_key: Optional[str]) -> List[Dict[str, str]]:
     if disease_key and disease_key in DISEASES:
         return DISEASES[disease_key]["links"]
-    
     return []
 
-def get_disease_summary(query: str) -> Optional[Dict[str, str]]:
-    """Get disease summary from comprehensive database"""
-    disease_key = _find_matching_disease(query)
-    
+def disease_summary_for(disease_key: Optional[str]) -> Optional[Dict[str, str]]:
     if disease_key and disease_key in DISEASES:
         disease_data = DISEASES[disease_key]
         return {
@@ -335,9 +163,16 @@ def get_disease_summary(query: str) -> Optional[Dict[str, str]]:
             "treatment": disease_data["treatment"],
             "prevention": disease_data["prevention"]
         }
-    
     return None
 
+def find_condition_pages(query: str) -> List[Dict[str, str]]:
+    """Find condition pages with correct direct links"""
+    return condition_pages_for(_find_matching_disease(query))
+
+def get_disease_summary(query: str) -> Optional[Dict[str, str]]:
+    """Get disease summary from comprehensive database"""
+    return disease_summary_for(_find_matching_disease(query))
+
 def extract_symptoms_from_pages(pages: List[Dict[str, str]]) -> List[str]:
     """Return empty list - not implemented"""
     return []
\ No newline at end of file
@@ -0,0 +1,311 @@
+# app/docstore.py
+"""
+Columnar, memory-mapped chunk store used on the serving path instead of one
+langchain Document (+ a duplicate text list) per chunk.
+
+Each build goes into its own generation directory; CURRENT names the live one:
+
+  <root>/CURRENT
+  <root>/.build.lock             held by the one process building a generation
+  <root>/gen-<...>/text.bin      every page_content, utf-8, back to back
+                  offsets.npy    int64 [N+1] byte offsets into text.bin
+                  ids.npy        chunk ids (fixed-width bytes)
+                  hashes.npy     uint8 [N, 20] sha1 of page_content
+                  site.npy       int16 code into meta["sites"]
+                  col_<key>.npy  int64 metadata column (ints, or codes into meta["strings"][key]);
+                                 "tokens" is the per-chunk token count from ingest
+                  embs-<m>.npy   float32 [N, D] corpus embeddings for model <m> (hard link into the
+                                 embedding cache when possible)
+                  meta.json      generation number, row count, segment state, column types,
+                                 string tables, per-model embedding info
+
+Metadata values that are ints stay ints; everything else is stored as a string.
+Only the rows a query returns are materialized, as DocView objects.
+
+Everything in a generation is memory-mapped read-only and never modified once
+published (embeddings for another model go into a fork() of it), so any number of worker processes can attach to it and share one copy
+through the page cache. A newer generation replaces CURRENT atomically; processes
+still reading an older one keep their mappings until they switch.
+"""
+import hashlib, json, os, shutil, time
+from array import array
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # not on POSIX: single-process use only
+    fcntl = None
+
+MISSING = np.iinfo(np.int64).min
+
+def _link_or_copy(src: str, dst: str):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+class DocView:
+    """Read-only stand-in for a Document: `.page_content` and `.metadata` for one row."""
+    __slots__ = ("_store", "row")
+
+    def __init__(self, store: "ColumnarDocStore", row: int):
+        self._store = store
+        self.row = row
+
+    @property
+    def page_content(self) -> str:
+        return self._store.text(self.row)
+
+    @property
+    def metadata(self) -> Dict:
+        return self._store.metadata(self.row)
+
+    @property
+    def id(self) -> str:
+        return self._store.doc_id(self.row)
+
+    @property
+    def tokens(self) -> int:
+        return self._store.tokens(self.row)
+
+class _Texts:
+    """Sequence view over the text column, decoded one row at a time."""
+
+    def __init__(self, store: "ColumnarDocStore"):
+        self._store = store
+
+    def __len__(self):
+        return len(self._store)
+
+    def __getitem__(self, i: int) -> str:
+        return self._store.text(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._store.text(i)
+
+class ColumnarDocStore:
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.state = self.meta["state"]
+        self.n = self.meta["n"]
+        self.generation = self.meta.get("generation", 0)
+        self._text = np.memmap(os.path.join(path, "text.bin"), dtype=np.uint8, mode="r") \
+            if os.path.getsize(os.path.join(path, "text.bin")) else np.zeros(0, dtype=np.uint8)
+        self._offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+        self._ids = np.load(os.path.join(path, "ids.npy"), mmap_mode="r")
+        self._hashes = np.load(os.path.join(path, "hashes.npy"), mmap_mode="r")
+        self._site = np.load(os.path.join(path, "site.npy"), mmap_mode="r")
+        self._cols = {k: np.load(os.path.join(path, f"col_{i}.npy"), mmap_mode="r")
+                      for i, k in enumerate(self.meta["columns"])}
+        self._strings = self.meta["strings"]
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def texts(self) -> _Texts:
+        return _Texts(self)
+
+    def text(self, i: int) -> str:
+        return self._text[self._offsets[i]:self._offsets[i + 1]].tobytes().decode("utf-8")
+
+    def metadata(self, i: int) -> Dict:
+        m = {}
+        for key, col in self._cols.items():
+            v = int(col[i])
+            if v == MISSING:
+                continue
+            table = self._strings.get(key)
+            m[key] = table[v] if table is not None else v
+        return m
+
+    def tokens(self, i: int) -> int:
+        """Token count from ingest (metadata["tokens"]); generations built before it get ~4 bytes a token."""
+        col = self._cols.get("tokens") if "tokens" not in self._strings else None
+        v = int(col[i]) if col is not None else MISSING
+        if v == MISSING:
+            return int(self._offsets[i + 1] - self._offsets[i]) // 4 + 1
+        return v
+
+    def doc_id(self, i: int) -> str:
+        return self._ids[i].decode("utf-8")
+
+    def content_hashes(self) -> List[str]:
+        return [bytes(h).hex() for h in self._hashes]
+
+    def rows_of_site(self, site: str) -> np.ndarray:
+        sites = self.meta["sites"]
+        if site not in sites:
+            return np.zeros(0, dtype=np.int64)
+        return np.flatnonzero(np.asarray(self._site) == sites.index(site))
+
+    def record(self, i: int) -> Dict:
+        return {"id": self.doc_id(i), "page_content": self.text(i), "metadata": self.metadata(i)}
+
+    def view(self, i: int) -> DocView:
+        return DocView(self, int(i))
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.path)
+
+    @staticmethod
+    def _emb_file(model: str) -> str:
+        return f"embs-{hashlib.sha1(model.encode('utf-8')).hexdigest()[:12]}.npy"
+
+    def embeddings(self, model: str) -> Optional[Tuple[np.ndarray, Dict]]:
+        """(memory-mapped [N, D] matrix, info) for `model`, or None if not attached yet."""
+        info = self.meta.get("embeddings", {}).get(model)
+        if info is None:
+            return None
+        try:
+            matrix = np.load(os.path.join(self.path, info["file"]), mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        return (matrix, info) if matrix.shape[0] == self.n else None
+
+    def attach_embeddings(self, model: str, matrix_path: str, **info) -> Tuple[np.ndarray, Dict]:
+        """Add `model`'s embeddings (an .npy aligned with the rows) to this unpublished generation."""
+        if self.current_name(os.path.dirname(self.path)) == self.name:
+            raise RuntimeError(f"{self.name} is published and read-only; fork() it first")
+        name = self._emb_file(model)
+        dst = os.path.join(self.path, name)
+        tmp = dst + f".tmp-{os.getpid()}"
+        _link_or_copy(matrix_path, tmp)  # same inode as the cache file: no copy, no extra page cache
+        os.replace(tmp, dst)
+        meta = dict(self.meta)
+        meta["embeddings"] = dict(meta.get("embeddings", {}), **{model: dict(info, file=name)})
+        self._write_meta(self.path, meta)
+        self.meta = meta
+        return self.embeddings(model)
+
+    @staticmethod
+    def _write_meta(path: str, meta: Dict):
+        tmp = os.path.join(path, f"meta.json.tmp-{os.getpid()}")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp, os.path.join(path, "meta.json"))
+
+    @staticmethod
+    def current_name(root: str) -> Optional[str]:
+        try:
+            with open(os.path.join(root, "CURRENT"), "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    @classmethod
+    def open(cls, root: str) -> Optional["ColumnarDocStore"]:
+        name = cls.current_name(root)
+        if name is None:
+            return None
+        try:
+            return cls(os.path.join(root, name))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    @staticmethod
+    @contextmanager
+    def build_lock(root: str):
+        """Exclusive across processes, so one worker builds while the others wait, then attach."""
+        os.makedirs(root, exist_ok=True)
+        with open(os.path.join(root, ".build.lock"), "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def fork(self) -> "ColumnarDocStore":
+        """A new, unpublished generation with the same rows, sharing this one's files by hard link."""
+        root = os.path.dirname(self.path)
+        path = os.path.join(root, f"gen-{int(time.time() * 1000)}-{os.getpid()}")
+        os.makedirs(path)
+        for name in os.listdir(self.path):
+            if name != "meta.json" and ".tmp-" not in name:
+                _link_or_copy(os.path.join(self.path, name), os.path.join(path, name))
+        self._write_meta(path, dict(self.meta, generation=self.generation + 1))
+        return type(self)(path)
+
+    def publish(self):
+        """Make this generation CURRENT and drop older ones."""
+        root = os.path.dirname(self.path)
+        tmp = os.path.join(root, f"CURRENT.tmp-{os.getpid()}")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.name)
+        os.replace(tmp, os.path.join(root, "CURRENT"))
+        self._prune(root, keep=self.name)
+
+    @classmethod
+    def build(cls, root: str, records: Iterable[Tuple[str, Dict]], state: Dict,
+              publish: bool = True) -> "ColumnarDocStore":
+        """Stream (site, record) pairs into a new generation; CURRENT moves to it if `publish`."""
+        prev = cls.open(root)
+        gen = f"gen-{int(time.time() * 1000)}-{os.getpid()}"
+        path = os.path.join(root, gen)
+        os.makedirs(path)
+        offsets, site_codes = array("q", [0]), array("h")
+        hashes, ids = bytearray(), []
+        sites: List[str] = []
+        cols: Dict[str, array] = {}
+        strings: Dict[str, Dict[str, int]] = {}
+        n = 0
+        with open(os.path.join(path, "text.bin"), "wb") as tf:
+            for site, rec in records:
+                text = rec.get("page_content", "").encode("utf-8")
+                tf.write(text)
+                offsets.append(offsets[-1] + len(text))
+                hashes += hashlib.sha1(text).digest()
+                ids.append(str(rec.get("id", "")).encode("utf-8"))
+                if site not in sites:
+                    sites.append(site)
+                site_codes.append(sites.index(site))
+                meta = rec.get("metadata") or {}
+                for key, v in meta.items():
+                    if key not in cols:
+                        cols[key] = array("q", [MISSING] * n)
+                        if not (isinstance(v, int) and not isinstance(v, bool)):
+                            strings[key] = {}
+                for key, col in cols.items():
+                    v = meta.get(key)
+                    if v is None:
+                        col.append(MISSING)
+                    elif key in strings:
+                        col.append(strings[key].setdefault(str(v), len(strings[key])))
+                    else:
+                        try:
+                            col.append(int(v))
+                        except (TypeError, ValueError):
+                            col.append(MISSING)
+                n += 1
+
+        width = max((len(i) for i in ids), default=1)
+        np.save(os.path.join(path, "offsets.npy"), np.frombuffer(offsets, dtype=np.int64))
+        np.save(os.path.join(path, "ids.npy"), np.array(ids, dtype=f"S{max(1, width)}"))
+        np.save(os.path.join(path, "hashes.npy"), np.frombuffer(bytes(hashes), dtype=np.uint8).reshape(n, 20))
+        np.save(os.path.join(path, "site.npy"), np.frombuffer(site_codes, dtype=np.int16))
+        for i, col in enumerate(cols.values()):
+            np.save(os.path.join(path, f"col_{i}.npy"), np.frombuffer(col, dtype=np.int64))
+        cls._write_meta(path, {"generation": (prev.generation + 1) if prev is not None else 1,
+                               "n": n, "state": state, "sites": sites, "columns": list(cols),
+                               "strings": {k: list(t) for k, t in strings.items()}})
+        store = cls(path)
+        if publish:
+            store.publish()
+        return store
+
+    @staticmethod
+    def _prune(root: str, keep: str, spare: int = 1):
+        """Drop old generations, leaving `spare` behind for processes still opening them."""
+        gens = sorted((g for g in os.listdir(root) if g.startswith("gen-") and g != keep
+                       and os.path.isdir(os.path.join(root, g))),
+                      key=lambda g: os.path.getmtime(os.path.join(root, g)))
+        for g in gens[:max(0, len(gens) - spare)]:
+            shutil.rmtree(os.path.join(root, g), ignore_errors=True)
@@ -0,0 +1,150 @@
+# app/embed_cache.py
+import hashlib, json, os, re, threading, time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence
+import numpy as np
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+def normalize_query(text: str) -> str:
+    """Case, whitespace and trailing punctuation don't change what a query asks."""
+    t = re.sub(r"\s+", " ", text.lower()).strip()
+    return t.strip(" ?!.,;:")
+
+class EmbeddingStore:
+    """
+    Persistent corpus embeddings keyed by chunk content hash.
+
+    Layout under `root`:
+      embs.npy   float32 matrix [N, D], rows in corpus order (opened with mmap)
+      keys.json  {"model": ..., "dim": D, "keys": [sha1, ...]}
+    A different model name invalidates the whole cache.
+    """
+
+    def __init__(self, root: str, model: str):
+        self.root = root
+        self.model = model
+        self.keys: List[str] = []
+        self.matrix: Optional[np.ndarray] = None
+        self.mat_path = os.path.join(root, "embs.npy")
+        self.keys_path = os.path.join(root, "keys.json")
+        self._open()
+
+    def _open(self):
+        self.keys, self.matrix = [], None
+        if not (os.path.exists(self.mat_path) and os.path.exists(self.keys_path)):
+            return
+        try:
+            with open(self.keys_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            matrix = np.load(self.mat_path, mmap_mode="r")
+        except Exception:
+            return
+        if meta.get("model") != self.model or len(meta.get("keys", [])) != matrix.shape[0]:
+            return  # stale or torn cache: rebuild from scratch
+        self.keys, self.matrix = meta["keys"], matrix
+
+    @property
+    def fingerprint(self) -> str:
+        """Identifies the cached corpus (model + ordered content hashes)."""
+        h = hashlib.sha1(self.model.encode("utf-8"))
+        for k in self.keys:
+            h.update(k.encode("ascii"))
+        return h.hexdigest()
+
+    def _save(self, keys: List[str], matrix: np.ndarray):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = f".tmp-{os.getpid()}"
+        # np.save appends .npy when missing, so keep the suffix on the temp name
+        np.save(self.mat_path + tmp + ".npy", matrix)
+        os.replace(self.mat_path + tmp + ".npy", self.mat_path)
+        with open(self.keys_path + tmp, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model, "dim": int(matrix.shape[1]), "keys": keys}, f)
+        os.replace(self.keys_path + tmp, self.keys_path)
+        self._open()
+
+    def get_or_encode(self, texts: Sequence[str], encode: Callable[[List[str]], np.ndarray],
+                      hashes: Optional[List[str]] = None) -> np.ndarray:
+        """
+        Return embeddings for `texts` in order, encoding only unseen content.
+        Pass `hashes` (content_hash of each text) to avoid touching the texts on a warm start;
+        `texts` then only needs to support len() and indexing.
+        """
+        if not len(texts):
+            return np.zeros((0, 0), dtype=np.float32)
+        if hashes is None:
+            hashes = [content_hash(t) for t in texts]
+        if self.matrix is not None and hashes == self.keys:
+            return self.matrix  # warm start: nothing to encode, nothing to copy
+
+        known = {}
+        for i, h in enumerate(self.keys):
+            known.setdefault(h, i)
+        missing = {}
+        for i, h in enumerate(hashes):
+            if h not in known and h not in missing:
+                missing[h] = texts[i]
+
+        fresh = {}
+        if missing:
+            new_embs = np.asarray(encode(list(missing.values())), dtype=np.float32)
+            fresh = {h: new_embs[j] for j, h in enumerate(missing)}
+
+        dim = self.matrix.shape[1] if self.matrix is not None else next(iter(fresh.values())).shape[0]
+        out = np.empty((len(hashes), dim), dtype=np.float32)
+        for i, h in enumerate(hashes):
+            out[i] = fresh[h] if h in fresh else self.matrix[known[h]]
+
+        # rewrite in corpus order so the next start takes the zero-copy path
+        self._save(hashes, out)
+        return self.matrix
+
+class QueryCache:
+    """Thread-safe LRU of query vectors keyed on (model, normalized query), with TTL."""
+
+    def __init__(self, model: str, maxsize: int = 4096, ttl_s: float = 3600.0):
+        self.model = model
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def set_model(self, model: str):
+        with self._lock:
+            if model != self.model:
+                self._data.clear()
+                self.model = model
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def get(self, query: str) -> Optional[np.ndarray]:
+        key = (self.model, query)
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, query: str, vec: np.ndarray):
+        if self.maxsize <= 0:
+            return
+        key = (self.model, query)
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_s, vec)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,207 @@
+# app/encoders.py
+"""
+Sentence embedding backends behind one SentenceTransformer-shaped `encode`.
+
+  torch      sentence-transformers on PyTorch
+  onnx       the same transformer exported to ONNX, run with ONNX Runtime
+  onnx_int8  ...with dynamically quantized int8 weights
+
+The ONNX backends only need onnxruntime and tokenizers at serve time, so loading them
+never imports torch. The export (first use, or --export ahead of a deploy) needs
+sentence-transformers once and writes ONNX_DIR/<model>/: model.onnx, model.int8.onnx,
+tokenizer.json and encoder.json (pooling and sequence length).
+
+  python -m app.encoders --export
+  python -m app.encoders --check      # cosine parity and latency against torch
+"""
+import json, os, re, shutil, tempfile
+from typing import List, Optional, Union
+import numpy as np
+
+EMBEDDINGS_BACKEND = os.getenv("EMBEDDINGS_BACKEND", "torch")  # torch | onnx | onnx_int8
+ONNX_DIR = os.getenv("ONNX_DIR", os.path.join(os.getenv("STORE_DIR", "./store"), ".onnx"))
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))  # intra-op threads, 0 = onnxruntime default
+ENCODE_BATCH = int(os.getenv("ENCODE_BATCH", "32"))
+
+def embedding_id(model: str, backend: str = EMBEDDINGS_BACKEND) -> str:
+    """Identity of the vectors a backend produces: int8 ones must not share caches with float ones."""
+    return f"{model}+int8" if backend == "onnx_int8" else model
+
+def model_dir(model: str) -> str:
+    return os.path.join(ONNX_DIR, re.sub(r"[^\w.-]+", "_", model))
+
+def export(model: str, directory: Optional[str] = None) -> str:
+    """Export the transformer of a sentence-transformers model to ONNX, with its tokenizer."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+    directory = directory or model_dir(model)
+    st = SentenceTransformer(model, device="cpu")
+    tok = st.tokenizer
+    names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in tok.model_input_names]
+
+    class Body(torch.nn.Module):  # positional inputs in, last_hidden_state out
+        def __init__(self, m):
+            super().__init__()
+            self.m = m
+
+        def forward(self, *inputs):
+            return self.m(**dict(zip(names, inputs)))[0]
+
+    os.makedirs(os.path.dirname(directory) or ".", exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=".export-", dir=os.path.dirname(directory) or ".")
+    try:
+        sample = tok(["a sample sentence", "another"], padding=True, return_tensors="pt")
+        axes = {n: {0: "batch", 1: "seq"} for n in names + ["last_hidden_state"]}
+        with torch.no_grad():
+            torch.onnx.export(Body(st[0].auto_model.eval()), tuple(sample[n] for n in names),
+                              os.path.join(tmp, "model.onnx"), input_names=names,
+                              output_names=["last_hidden_state"], dynamic_axes=axes, opset_version=14)
+        tok.save_pretrained(tmp)  # tokenizer.json, readable by `tokenizers` alone
+        meta = {"model": model, "pooling": st[1].get_pooling_mode_str(), "max_seq_length": st.max_seq_length,
+                "pad_id": tok.pad_token_id, "pad_token": tok.pad_token}
+        with open(os.path.join(tmp, "encoder.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp, directory)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return directory
+
+def quantize(directory: str) -> str:
+    """Dynamic int8 quantization of the exported weights; activations stay float."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    out = os.path.join(directory, "model.int8.onnx")
+    tmp = out + f".tmp-{os.getpid()}"
+    quantize_dynamic(os.path.join(directory, "model.onnx"), tmp, weight_type=QuantType.QInt8)
+    os.replace(tmp, out)
+    return out
+
+class OnnxEncoder:
+    """ONNX Runtime session plus a fast tokenizer, pooled the way sentence-transformers pools."""
+
+    def __init__(self, directory: str, int8: bool = False, threads: int = ONNX_THREADS):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+        with open(os.path.join(directory, "encoder.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.tokenizer = Tokenizer.from_file(os.path.join(directory, "tokenizer.json"))
+        self.tokenizer.enable_truncation(self.meta["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.meta["pad_id"], pad_token=self.meta["pad_token"])
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        opts.inter_op_num_threads = 1  # one graph, run op by op; parallelism is inside the matmuls
+        if threads:
+            opts.intra_op_num_threads = threads
+        path = os.path.join(directory, "model.int8.onnx" if int8 else "model.onnx")
+        self.session = ort.InferenceSession(path, opts, providers=["CPUExecutionProvider"])
+        self.inputs = [i.name for i in self.session.get_inputs()]
+
+    def _pool(self, hidden: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        mode = self.meta["pooling"]
+        if mode == "cls":
+            return hidden[:, 0]
+        m = mask[:, :, None].astype(hidden.dtype)
+        if mode == "max":
+            return np.where(m > 0, hidden, -1e9).max(axis=1)
+        return (hidden * m).sum(axis=1) / np.clip(m.sum(axis=1), 1e-9, None)
+
+    def _run(self, texts: List[str]) -> np.ndarray:
+        enc = self.tokenizer.encode_batch(texts)
+        feed = {"input_ids": np.array([e.ids for e in enc], dtype=np.int64),
+                "attention_mask": np.array([e.attention_mask for e in enc], dtype=np.int64),
+                "token_type_ids": np.array([e.type_ids for e in enc], dtype=np.int64)}
+        hidden = self.session.run(None, {n: feed[n] for n in self.inputs})[0]
+        return self._pool(hidden, feed["attention_mask"])
+
+    def encode(self, texts: Union[str, List[str]], normalize_embeddings: bool = False,
+               batch_size: int = ENCODE_BATCH, **kw) -> np.ndarray:
+        if isinstance(texts, str):
+            return self.encode([texts], normalize_embeddings, batch_size)[0]
+        order = np.argsort([-len(t) for t in texts], kind="stable")  # similar lengths share padding
+        parts = [self._run([texts[i] for i in order[s:s + batch_size]]) for s in range(0, len(texts), batch_size)]
+        out = np.empty((len(texts), parts[0].shape[1] if parts else 0), dtype=np.float32)
+        if parts:
+            out[order] = np.vstack(parts)
+        if normalize_embeddings:
+            n = np.linalg.norm(out, axis=1, keepdims=True)
+            n[n == 0] = 1.0
+            out /= n
+        return out
+
+def load_encoder(model: str, backend: str = EMBEDDINGS_BACKEND):
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model)
+    if backend not in ("onnx", "onnx_int8"):
+        raise ValueError(f"unknown EMBEDDINGS_BACKEND: {backend}")
+    from app.docstore import ColumnarDocStore
+    directory = model_dir(model)
+    with ColumnarDocStore.build_lock(ONNX_DIR):  # one worker exports, the rest reuse it
+        if not os.path.exists(os.path.join(directory, "encoder.json")):
+            export(model, directory)
+        if backend == "onnx_int8" and not os.path.exists(os.path.join(directory, "model.int8.onnx")):
+            quantize(directory)
+    return OnnxEncoder(directory, int8=backend == "onnx_int8")
+
+if __name__ == "__main__":
+    import argparse, sys, time
+    from app.docstore import ColumnarDocStore
+    from app.rag import DOCSTORE_DIR, EMBEDDINGS_MODEL
+
+    ap = argparse.ArgumentParser(description="Export ONNX encoders and compare them with PyTorch")
+    ap.add_argument("--export", action="store_true", help="(re)export and quantize, then exit")
+    ap.add_argument("--check", action="store_true", help="cosine parity and latency against torch")
+    ap.add_argument("--backends", nargs="+", default=["onnx", "onnx_int8"], choices=["onnx", "onnx_int8"])
+    ap.add_argument("--questions", default="eval/eval_questions.jsonl")
+    ap.add_argument("--chunks", type=int, default=512, help="corpus chunks encoded for the batch comparison")
+    ap.add_argument("--min-cosine", type=float, default=0.98)
+    args = ap.parse_args()
+
+    if args.export:
+        quantize(export(EMBEDDINGS_MODEL))
+        print(f"[ok] exported {EMBEDDINGS_MODEL} to {model_dir(EMBEDDINGS_MODEL)}")
+        sys.exit(0)
+    if not args.check:
+        ap.error("nothing to do: pass --export or --check")
+
+    questions = []
+    if os.path.exists(args.questions):
+        with open(args.questions, "r", encoding="utf-8") as f:
+            questions = [json.loads(line)["query"] for line in f if line.strip()]
+    ds = ColumnarDocStore.open(DOCSTORE_DIR)
+    chunks = [ds.texts[i] for i in range(min(args.chunks, len(ds)))] if ds is not None else []
+    texts = questions + chunks
+    if not texts:
+        sys.exit("no eval questions or docstore chunks to encode")
+
+    def measure(backend: str) -> dict:
+        t0 = time.perf_counter()
+        enc = load_encoder(EMBEDDINGS_MODEL, backend)  # onnx backends run first, before torch is imported
+        load_s = time.perf_counter() - t0
+        single = []
+        for q in questions or texts[:50]:
+            t0 = time.perf_counter()
+            enc.encode([q], normalize_embeddings=True)
+            single.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        vecs = np.asarray(enc.encode(texts, normalize_embeddings=True), dtype=np.float32)
+        batch_s = time.perf_counter() - t0
+        ms = np.asarray(single) * 1000.0
+        return {"backend": backend, "vecs": vecs, "load_s": round(load_s, 3),
+                "query_p50_ms": round(float(np.percentile(ms, 50)), 2),
+                "query_p95_ms": round(float(np.percentile(ms, 95)), 2),
+                "batch_texts_per_s": round(len(texts) / batch_s, 1)}
+
+    runs = [measure(b) for b in args.backends] + [measure("torch")]
+    ref = runs[-1]["vecs"]
+    ok = True
+    for run in runs:
+        cos = np.sum(run.pop("vecs") * ref, axis=1)
+        if run["backend"] != "torch":
+            run.update({"texts": len(texts), "cosine_min": round(float(cos.min()), 5),
+                        "cosine_mean": round(float(cos.mean()), 5)})
+            ok &= bool(cos.min() >= args.min_cosine)
+        print(json.dumps(run))
+    if not ok:
+        sys.exit(f"cosine parity below {args.min_cosine}")
@@ -1,3 +1,5 @@
+import re
+
 EMERGENCY_KEYWORDS = [
     "severe chest pain","trouble breathing","blue lips","unconscious",
     "stroke","heart attack","suicidal","poisoning","overdose","heavy bleeding"
@@ -8,9 +10,15 @@ DISCLAIMER = (
   "If this is an emergency or you are in immediate danger, call your local emergency number (e.g., 911 in the U.S.) now."
 )
 
+# one alternation compiled at import instead of a substring scan per keyword per call
+_EMERGENCY_RE = re.compile("|".join(re.escape(k) for k in EMERGENCY_KEYWORDS))
+
+def match_emergency(text_lower: str) -> bool:
+    """Emergency check on text that is already lowercased."""
+    return _EMERGENCY_RE.search(text_lower) is not None
+
 def emergency_flag(text: str) -> bool:
-    t = text.lower()
-    return any(k in t for k in EMERGENCY_KEYWORDS)
+    return match_emergency(text.lower())
 
 def instruction_prompt():
     return (
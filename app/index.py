@@ -0,0 +1,361 @@
+# app/index.py
+import json, os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple
+import numpy as np
+
+INDEX_KIND = os.getenv("RETRIEVAL_INDEX", "exact")  # exact | sharded | ivf | hnsw
+INDEX_SHARDS = int(os.getenv("INDEX_SHARDS", "0"))  # sharded index: 0 = one per CPU
+EMB_PRECISION = os.getenv("EMB_PRECISION", "float32")  # float32 | float16 | int8 (exact index only)
+RESCORE_FACTOR = int(os.getenv("RESCORE_FACTOR", "4"))  # compressed candidates per final hit
+IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))        # 0 = about 4 * sqrt(N)
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8"))
+HNSW_M = int(os.getenv("HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "80"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+
+_faiss_module = False  # not imported yet
+
+def _faiss():
+    """faiss, imported on first use (exact and sharded search never need it), or None if missing."""
+    global _faiss_module
+    if _faiss_module is False:
+        try:
+            import faiss
+        except ImportError:
+            faiss = None
+        _faiss_module = faiss
+    return _faiss_module
+
+def topk_rows(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-row top-k of a [B, N] score matrix, best first, without a full sort."""
+    n = scores.shape[1]
+    k = min(k, n)
+    if k <= 0:
+        empty = np.zeros((scores.shape[0], 0))
+        return empty.astype(scores.dtype), empty.astype(np.int64)
+    if k < n:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        part = np.tile(np.arange(n), (scores.shape[0], 1))
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1)
+    return np.take_along_axis(part_scores, order, axis=1), np.take_along_axis(part, order, axis=1)
+
+class ExactIndex:
+    """Brute-force inner product over the (normalized) corpus matrix."""
+    kind = "exact"
+
+    def __init__(self, embs: np.ndarray):
+        self.embs = embs
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        return topk_rows(np.dot(queries, self.embs.T), k)
+
+    def save(self, path: str):
+        pass  # the embedding cache already persists the matrix
+
+class ShardedIndex:
+    """
+    Exact search split over row ranges of the corpus matrix. Each shard is a view of the
+    (memory-mapped) matrix and is scored on its own thread; numpy releases the GIL inside
+    the BLAS call, so shards run on separate cores, and no [B, N] score matrix is ever
+    materialized. Per-shard top-k lists are merged into the global top-k.
+
+    Run with OPENBLAS_NUM_THREADS=1 (or OMP_NUM_THREADS=1) so BLAS threads don't
+    oversubscribe the cores the shards already use.
+    """
+    kind = "sharded"
+
+    def __init__(self, embs: np.ndarray, shards: int = INDEX_SHARDS):
+        n = embs.shape[0]
+        shards = max(1, min(shards or os.cpu_count() or 1, n or 1))
+        bounds = np.linspace(0, n, shards + 1).astype(np.int64)
+        self.embs = embs
+        self.offsets = [int(b) for b in bounds[:-1]]
+        self.shards = [embs[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+        self._pool = ThreadPoolExecutor(max_workers=shards, thread_name_prefix="shard")
+
+    def _search_shard(self, i: int, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        scores, ids = topk_rows(np.dot(queries, self.shards[i].T), k)
+        return scores, ids + self.offsets[i]
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        if len(self.shards) == 1:
+            return self._search_shard(0, queries, k)
+        parts = list(self._pool.map(lambda i: self._search_shard(i, queries, k), range(len(self.shards))))
+        scores = np.hstack([p[0] for p in parts])
+        ids = np.hstack([p[1] for p in parts])
+        top, pos = topk_rows(scores, k)
+        return top, np.take_along_axis(ids, pos, axis=1)
+
+    def save(self, path: str):
+        pass
+
+class FaissIndex:
+    """Wrapper around an IVF-flat or HNSW faiss index using inner product."""
+
+    def __init__(self, kind: str, index):
+        self.kind = kind
+        self.index = index
+        self._tune()
+
+    def _tune(self):
+        if self.kind == "ivf":
+            self.index.nprobe = IVF_NPROBE
+        elif self.kind == "hnsw":
+            self.index.hnsw.efSearch = HNSW_EF_SEARCH
+
+    @classmethod
+    def build(cls, kind: str, embs: np.ndarray) -> "FaissIndex":
+        faiss = _faiss()
+        if faiss is None:
+            raise RuntimeError(f"RETRIEVAL_INDEX={kind} requires faiss-cpu")
+        x = np.ascontiguousarray(embs, dtype=np.float32)
+        n, d = x.shape
+        if kind == "ivf":
+            nlist = IVF_NLIST or int(4 * np.sqrt(n))
+            nlist = max(1, min(nlist, n))
+            quantizer = faiss.IndexFlatIP(d)
+            index = faiss.IndexIVFFlat(quantizer, d, nlist, faiss.METRIC_INNER_PRODUCT)
+            index.train(x)
+        elif kind == "hnsw":
+            index = faiss.IndexHNSWFlat(d, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        else:
+            raise ValueError(f"unknown index kind: {kind}")
+        index.add(x)
+        return cls(kind, index)
+
+    @classmethod
+    def load(cls, kind: str, path: str) -> "FaissIndex":
+        return cls(kind, _faiss().read_index(path))
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        k = min(k, self.index.ntotal)
+        return self.index.search(np.ascontiguousarray(queries, dtype=np.float32), k)
+
+    def save(self, path: str):
+        _faiss().write_index(self.index, path)
+
+def _pad(rows, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    scores = np.full((len(rows), k), -np.inf, dtype=np.float32)
+    ids = np.full((len(rows), k), -1, dtype=np.int64)
+    for r, (s, i) in enumerate(rows):
+        scores[r, :len(s)] = s
+        ids[r, :len(i)] = i
+    return scores, ids
+
+class QuantizedIndex:
+    """
+    Exact search over a float16 or int8 copy of the corpus, then rescoring of the best
+    k * RESCORE_FACTOR candidates against the full-precision matrix, which stays memory-mapped
+    on disk so only the rescored rows are paged in.
+
+    int8 uses a per-dimension range. With faiss this is its scalar quantizer (SIMD distance
+    kernels); without it, codes are kept in numpy and scored block by block.
+    """
+    BLOCK = 65536
+
+    def __init__(self, precision: str, embs: np.ndarray, coarse):
+        self.kind = f"sq_{precision}"
+        self.precision = precision
+        self.embs = embs
+        self.coarse = coarse  # faiss.IndexScalarQuantizer, or (codes, scale) numpy arrays
+
+    @classmethod
+    def build(cls, precision: str, embs: np.ndarray) -> "QuantizedIndex":
+        if precision not in ("float16", "int8"):
+            raise ValueError(f"unknown EMB_PRECISION: {precision}")
+        n, d = embs.shape
+        faiss = _faiss()
+        if faiss is not None:
+            qt = faiss.ScalarQuantizer.QT_fp16 if precision == "float16" else faiss.ScalarQuantizer.QT_8bit
+            index = faiss.IndexScalarQuantizer(d, qt, faiss.METRIC_INNER_PRODUCT)
+            rng = np.random.default_rng(0)
+            sample = np.sort(rng.choice(n, size=min(n, 100_000), replace=False))
+            index.train(np.ascontiguousarray(embs[sample], dtype=np.float32))
+            for start in range(0, n, cls.BLOCK):
+                index.add(np.ascontiguousarray(embs[start:start + cls.BLOCK], dtype=np.float32))
+            return cls(precision, embs, index)
+        if precision == "float16":
+            codes, scale = np.empty((n, d), dtype=np.float16), None
+        else:
+            scale = np.abs(embs).max(axis=0).astype(np.float32) / 127.0
+            scale[scale == 0] = 1.0
+            codes = np.empty((n, d), dtype=np.int8)
+        for start in range(0, n, cls.BLOCK):
+            block = np.asarray(embs[start:start + cls.BLOCK], dtype=np.float32)
+            codes[start:start + cls.BLOCK] = block if scale is None else np.round(block / scale)
+        return cls(precision, embs, (codes, scale))
+
+    @classmethod
+    def load(cls, precision: str, path: str, embs: np.ndarray) -> "QuantizedIndex":
+        if path.endswith(".faiss"):
+            return cls(precision, embs, _faiss().read_index(path))
+        z = np.load(path)
+        return cls(precision, embs, (z["codes"], z["scale"] if z["scale"].size else None))
+
+    def save(self, path: str):
+        if not isinstance(self.coarse, tuple):
+            _faiss().write_index(self.coarse, path)
+        else:
+            codes, scale = self.coarse
+            np.savez(path, codes=codes, scale=scale if scale is not None else np.zeros(0))
+
+    @property
+    def nbytes(self) -> int:
+        if isinstance(self.coarse, tuple):
+            return int(self.coarse[0].nbytes)
+        return int(self.coarse.sa_code_size() * self.coarse.ntotal)
+
+    def _coarse_search(self, queries: np.ndarray, n: int) -> np.ndarray:
+        if not isinstance(self.coarse, tuple):
+            return self.coarse.search(np.ascontiguousarray(queries, dtype=np.float32), n)[1]
+        codes, scale = self.coarse
+        q = queries * scale if scale is not None else queries  # q . (c * s) == (q * s) . c
+        best_s = np.zeros((len(q), 0), dtype=np.float32)
+        best_i = np.zeros((len(q), 0), dtype=np.int64)
+        for start in range(0, len(codes), self.BLOCK):
+            block = np.asarray(codes[start:start + self.BLOCK], dtype=np.float32)
+            s, i = topk_rows(q @ block.T, n)
+            s, j = topk_rows(np.hstack([best_s, s]), n)
+            best_i = np.take_along_axis(np.hstack([best_i, i + start]), j, axis=1)
+            best_s = s
+        return best_i
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        n_docs = self.embs.shape[0]
+        k = min(k, n_docs)
+        cand = self._coarse_search(queries, min(n_docs, max(k, k * RESCORE_FACTOR)))
+        rows = []
+        for q, row in zip(queries, cand):
+            row = np.sort(row[row >= 0])  # ascending rows read the memory-mapped matrix in order
+            s, i = topk_rows((np.asarray(self.embs[row]) @ q)[None, :], k)
+            rows.append((s[0], row[i[0]]))
+        return _pad(rows, k)
+
+def _params(kind: str) -> dict:
+    if kind == "ivf":
+        return {"nlist": IVF_NLIST}
+    if kind == "hnsw":
+        return {"m": HNSW_M, "ef_construction": HNSW_EF_CONSTRUCTION}
+    return {}
+
+def resolve_kind(kind: str = INDEX_KIND, precision: str = EMB_PRECISION) -> str:
+    """Compressed storage applies to the exact backend: exact + int8 -> sq_int8."""
+    if kind == "exact" and precision != "float32":
+        return f"sq_{precision}"
+    return kind
+
+def load_or_build(kind: str, embs: np.ndarray, directory: str, fingerprint: str):
+    """Load the saved index for this corpus fingerprint, or build and save a new one."""
+    if kind == "exact":
+        return ExactIndex(embs)
+    if kind == "sharded":
+        return ShardedIndex(embs)
+    if kind.startswith("sq_"):
+        return _load_or_build_quantized(kind[3:], embs, directory, fingerprint)
+    path = os.path.join(directory, f"{kind}.faiss")
+    meta_path = os.path.join(directory, f"{kind}.json")
+    meta = {"kind": kind, "fingerprint": fingerprint, "params": _params(kind)}
+    if _faiss() is not None and os.path.exists(path) and os.path.exists(meta_path):
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                if json.load(f) == meta:
+                    return FaissIndex.load(kind, path)
+        except Exception:
+            pass
+    index = FaissIndex.build(kind, embs)
+    os.makedirs(directory, exist_ok=True)
+    index.save(path)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    return index
+
+def _load_or_build_quantized(precision: str, embs: np.ndarray, directory: str, fingerprint: str):
+    ext = ".faiss" if _faiss() is not None else ".npz"
+    path = os.path.join(directory, f"sq_{precision}{ext}")
+    meta_path = os.path.join(directory, f"sq_{precision}.json")
+    meta = {"kind": f"sq_{precision}", "fingerprint": fingerprint, "backend": ext[1:]}
+    if os.path.exists(path) and os.path.exists(meta_path):
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                if json.load(f) == meta:
+                    return QuantizedIndex.load(precision, path, embs)
+        except Exception:
+            pass
+    index = QuantizedIndex.build(precision, embs)
+    os.makedirs(directory, exist_ok=True)
+    index.save(path)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    return index
+
+def build_index(kind: str, embs: np.ndarray):
+    """Fresh in-memory index of any kind, for offline comparisons."""
+    if kind == "exact":
+        return ExactIndex(embs)
+    if kind == "sharded":
+        return ShardedIndex(embs)
+    if kind.startswith("sq_"):
+        return QuantizedIndex.build(kind[3:], embs)
+    return FaissIndex.build(kind, embs)
+
+def recall_at_k(index, embs: np.ndarray, queries: np.ndarray, k: int = 10) -> float:
+    """Mean overlap between `index` top-k and exact top-k for the given queries."""
+    _, truth = ExactIndex(embs).search(queries, k)
+    _, got = index.search(queries, k)
+    hits = [len(set(t.tolist()) & set(g.tolist())) / max(1, len(t)) for t, g in zip(truth, got)]
+    return float(np.mean(hits)) if hits else 0.0
+
+if __name__ == "__main__":
+    import argparse, time
+    from app.rag import get_retriever
+    r = get_retriever()
+
+    ap = argparse.ArgumentParser(description="Compare ANN / compressed indexes against exact float32 search")
+    ap.add_argument("--kind", nargs="+", default=["hnsw"], choices=["sharded", "ivf", "hnsw", "sq_float16", "sq_int8"])
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--sample", type=int, default=200, help="corpus rows reused as probe queries")
+    ap.add_argument("--questions", default="eval/eval_questions.jsonl")
+    ap.add_argument("--shards", type=int, nargs="+", default=[INDEX_SHARDS],
+                    help="shard counts to compare for --kind sharded, e.g. 1 2 4 8")
+    args = ap.parse_args()
+
+    queries = []
+    if os.path.exists(args.questions):
+        with open(args.questions, "r", encoding="utf-8") as f:
+            qs = [json.loads(line)["query"] for line in f if line.strip()]
+        queries.append(r._encode(qs))
+    rng = np.random.default_rng(0)
+    rows = rng.choice(r.doc_embs.shape[0], size=min(args.sample, r.doc_embs.shape[0]), replace=False)
+    queries.append(np.asarray(r.doc_embs[np.sort(rows)]))
+    queries = np.vstack(queries).astype(np.float32)
+
+    exact = ExactIndex(r.doc_embs)
+    t0 = time.perf_counter()
+    exact.search(queries, args.k)
+    exact_s = time.perf_counter() - t0
+    runs = [(kind, s) for kind in args.kind for s in (args.shards if kind == "sharded" else [None])]
+    for kind, shards in runs:
+        t0 = time.perf_counter()
+        index = ShardedIndex(r.doc_embs, shards) if kind == "sharded" else build_index(kind, r.doc_embs)
+        build_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        index.search(queries, args.k)
+        search_s = time.perf_counter() - t0
+        rec = recall_at_k(index, r.doc_embs, queries, k=args.k)
+        report = {"kind": kind, "params": _params(kind), "n": int(r.doc_embs.shape[0]),
+                  "queries": int(queries.shape[0]), f"recall@{args.k}": round(rec, 4),
+                  "build_s": round(build_s, 3), "search_s": round(search_s, 4),
+                  "exact_search_s": round(exact_s, 4)}
+        if isinstance(index, ShardedIndex):
+            _, truth = exact.search(queries, args.k)
+            _, got = index.search(queries, args.k)
+            report.update({"shards": len(index.shards), "identical": float(np.mean(np.all(truth == got, axis=1))),
+                           "speedup": round(exact_s / search_s, 2) if search_s else None})
+        if isinstance(index, QuantizedIndex):
+            report.update({"rescore_factor": RESCORE_FACTOR, "code_bytes": index.nbytes,
+                           "float32_bytes": int(r.doc_embs.shape[0] * r.doc_embs.shape[1] * 4)})
+        print(json.dumps(report))
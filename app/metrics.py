@@ -0,0 +1,146 @@
+# app/metrics.py
+"""
+Minimal in-process metrics: counters, gauges and histograms rendered in the Prometheus
+text exposition format, plus a stage timer.
+
+    with stage("encode"):
+        ...
+
+feeds the `rag_stage_seconds{stage=...}` histogram and, when the current request opted in
+via `collect()`, adds the milliseconds to that request's timings dict as well.
+"""
+import threading, time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _num(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 fn: Optional[Callable[[], float]] = None):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.fn = fn  # value owned elsewhere, read at scrape time
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        head = f"# HELP {self.name} {self.help}\n# TYPE {self.name} {self.kind}\n"
+        return head + "".join(line + "\n" for line in self.samples())
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self):
+        if self.fn is not None:
+            yield f"{self.name} {_num(self.fn())}"
+            return
+        with self._lock:
+            items = list(self._values.items())
+        for key, v in items:
+            yield f"{self.name}{_labels(self.labelnames, key)} {_num(v)}"
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple, List] = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    row[i] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        for key, row in items:
+            for b, n in zip(self.buckets + (float("inf"),), row[:len(self.buckets)] + [row[-1]]):
+                le = 'le="%s"' % _num(b)
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, le)} {n}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_num(row[-2])}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {row[-1]}"
+
+REGISTRY: List[_Metric] = []
+
+def render() -> str:
+    return "".join(m.render() for m in REGISTRY)
+
+REQUESTS = Counter("rag_http_requests_total", "HTTP requests by route and status", ("route", "method", "status"))
+REQUEST_SECONDS = Histogram("rag_http_request_seconds", "Time to response headers by route", ("route",))
+STAGE_SECONDS = Histogram("rag_stage_seconds", "Time spent per pipeline stage", ("stage",))
+
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("stage_timings", default=None)
+
+@contextmanager
+def collect(into: Optional[Dict[str, float]] = None):
+    """Record every stage() run in this context (task or thread) into a dict of milliseconds."""
+    d = {} if into is None else into
+    token = _timings.set(d)
+    try:
+        yield d
+    finally:
+        _timings.reset(token)
+
+def record(name: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage=name)
+    d = _timings.get()
+    if d is not None:
+        d[name] = round(d.get(name, 0.0) + seconds * 1000.0, 3)
+
+@contextmanager
+def stage(name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - t0)
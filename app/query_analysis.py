@@ -0,0 +1,30 @@
+# app/query_analysis.py
+from dataclasses import dataclass
+from typing import Optional, Tuple
+from app.guardrails import match_emergency
+from app.condition_links import match_disease_tokens, tokenize
+from app.metrics import stage
+
+@dataclass(frozen=True)
+class QueryAnalysis:
+    """Everything /ask needs from the raw query, computed in one pass."""
+    raw: str
+    text: str                 # lowercased, whitespace collapsed
+    tokens: Tuple[str, ...]
+    emergency: bool
+    disease_key: Optional[str]
+
+def analyze_query(query: str) -> QueryAnalysis:
+    text = " ".join(query.lower().split())
+    tokens = tuple(tokenize(text))
+    with stage("emergency_flag"):
+        emergency = match_emergency(text)
+    with stage("condition_match"):
+        disease_key = match_disease_tokens(tokens)
+    return QueryAnalysis(
+        raw=query,
+        text=text,
+        tokens=tokens,
+        emergency=emergency,
+        disease_key=disease_key,
+    )
@@ -1,80 +1,410 @@
-import json, os
-from typing import List
+import hashlib, os, threading, time
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from langchain.docstore.document import Document
+from app.condition_links import add_known_words
+from app.docstore import ColumnarDocStore, DocView
+from app.embed_cache import EmbeddingStore, QueryCache, normalize_query
+from app.encoders import embedding_id, load_encoder
+from app import index as index_config
+from app.index import load_or_build, resolve_kind, topk_rows
+from app.metrics import stage
+from data_ingest.lexical import BM25Index, fingerprint as lexical_fingerprint
+from data_ingest.store import SITES, SegmentStore, apply_record, iter_records
+from data_ingest.token_count import count_tokens
 
 EMBEDDINGS_MODEL = os.getenv("EMBEDDINGS_MODEL", "all-MiniLM-L6-v2")
+EMBEDDINGS_ID = embedding_id(EMBEDDINGS_MODEL)  # keys the query, corpus and docstore embeddings
 STORE_DIR = os.getenv("STORE_DIR", "./store")
+EMB_CACHE_DIR = os.getenv("EMB_CACHE_DIR", os.path.join(STORE_DIR, ".emb_cache"))
+INDEX_DIR = os.getenv("INDEX_DIR", os.path.join(STORE_DIR, ".index"))
+DOCSTORE_DIR = os.getenv("DOCSTORE_DIR", os.path.join(STORE_DIR, ".docstore"))
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "4096"))
+QUERY_CACHE_TTL_S = float(os.getenv("QUERY_CACHE_TTL_S", "3600"))
+LEXICAL_DIR = os.getenv("LEXICAL_DIR", os.path.join(STORE_DIR, ".lexical"))
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "dense")  # dense | pruned | hybrid
+LEXICAL_CANDIDATES = int(os.getenv("LEXICAL_CANDIDATES", "1000"))
+LEXICAL_MIN_HITS = int(os.getenv("LEXICAL_MIN_HITS", "20"))
+HYBRID_DEPTH = int(os.getenv("HYBRID_DEPTH", "50"))
+RRF_K = 60  # reciprocal rank fusion constant
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))  # prompt context, 0 = unlimited
+CONTEXT_CHUNK_OVERHEAD = 24  # tokens allowed per chunk for its [title](source) header and separator
+
+# Fallback single doc prompting user to ingest data
+FALLBACK_DOC = {
+    "id": "setup-required",
+    "page_content": "No medical corpus found. Run the ingestion scripts to populate ./store/.",
+    "metadata": {"title": "Setup Required", "source": "system", "chunk_id": 0},
+}
+
+def _with_tokens(rec: Dict) -> Dict:
+    meta = rec.get("metadata") or {}
+    if "tokens" in meta:
+        return rec
+    return dict(rec, metadata=dict(meta, tokens=count_tokens(rec.get("page_content", ""))))
+
+def retrieval_version(fingerprint: str) -> str:
+    """Corpus plus every setting that changes which docs come back or the context built from them;
+    keys the response and eval caches."""
+    parts = (fingerprint, resolve_kind(), RETRIEVAL_MODE,
+             index_config.EMB_PRECISION, index_config.RESCORE_FACTOR,
+             index_config.IVF_NLIST, index_config.IVF_NPROBE,
+             index_config.HNSW_M, index_config.HNSW_EF_CONSTRUCTION, index_config.HNSW_EF_SEARCH,
+             LEXICAL_CANDIDATES, LEXICAL_MIN_HITS, HYBRID_DEPTH, CONTEXT_TOKEN_BUDGET)
+    return hashlib.sha1("|".join(map(str, parts)).encode()).hexdigest()[:16]
 
 class Retriever:
-    def __init__(self):
-        self.emb = SentenceTransformer(EMBEDDINGS_MODEL)
-        self.docs: List[Document] = []
-        self.doc_texts: List[str] = []
-        self.doc_embs = None  # numpy array [N, D]
-        self._load()
-
-    def _load_jsonl(self, path: str):
-        items = []
-        if not os.path.exists(path):
-            return items
-        with open(path, "r", encoding="utf-8") as f:
-            for line in f:
-                try:
-                    d = json.loads(line)
-                    items.append(d)
-                except Exception:
-                    continue
-        return items
+    def __init__(self, query_cache: QueryCache = None, load: bool = True):
+        self.emb = None
+        self.query_cache = query_cache or QueryCache(EMBEDDINGS_ID, QUERY_CACHE_SIZE, QUERY_CACHE_TTL_S)
+        self.query_cache.set_model(EMBEDDINGS_ID)
+        self.docstore: Optional[ColumnarDocStore] = None
+        self.doc_embs = None  # numpy array [N, D], memory-mapped from the docstore generation
+        self._emb_cache: Optional[EmbeddingStore] = None
+        self.fingerprint = ""  # model + ordered content hashes of the attached corpus
+        self.lexical_fingerprint = ""
+        self.index = None
+        self.lexical = None  # BM25Index, only for the pruned / hybrid modes
+        self.version = ""  # changes whenever retrieval results could change
+        self.stages: Dict[str, float] = {}  # completed load stage -> seconds taken
+        if load:
+            self._load()
+
+    def _stage(self, name: str, fn):
+        t0 = time.perf_counter()
+        out = fn()
+        self.stages[name] = round(time.perf_counter() - t0, 3)
+        return out
+
+    def _load_model(self):
+        # torch / onnxruntime are imported here, never on the import path
+        self.emb = load_encoder(EMBEDDINGS_MODEL)
+
+    @property
+    def emb_cache(self) -> EmbeddingStore:
+        # only the process that builds a generation needs the per-chunk key list
+        if self._emb_cache is None:
+            self._emb_cache = EmbeddingStore(EMB_CACHE_DIR, EMBEDDINGS_ID)
+        return self._emb_cache
+
+    def status(self) -> Dict:
+        return {
+            "model_loaded": self.emb is not None,
+            "docstore_loaded": self.docstore is not None,
+            "generation": self.docstore.generation if self.docstore is not None else 0,
+            "index_built": self.index is not None,
+            "chunks": len(self.docstore) if self.docstore is not None else 0,
+            "corpus_version": self.version,
+            "stages_s": dict(self.stages),
+        }
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        return self.emb.encode(texts, normalize_embeddings=True)
+
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        Query vectors [B, D]; repeated queries skip the model. normalize_query is only the
+        cache key: the model encodes the text as the user typed it, so variants that differ
+        in case or spacing share the vector of whichever one was encoded first.
+        """
+        keys = [normalize_query(q) for q in queries]
+        vecs, missing = {}, {}
+        for key, query in zip(keys, queries):
+            if key in vecs or key in missing:
+                continue
+            vec = self.query_cache.get(key)
+            if vec is None:
+                missing[key] = query
+            else:
+                vecs[key] = vec
+        if missing:
+            with stage("encode"):
+                encoded = self._encode(list(missing.values()))
+            for key, vec in zip(missing, encoded):
+                self.query_cache.put(key, vec)
+                vecs[key] = vec
+        return np.stack([vecs[key] for key in keys])
+
+    def _records(self, state: Dict, paths: Dict, old: Optional[ColumnarDocStore]) -> Iterator[Tuple[str, Dict]]:
+        """
+        Live (site, record) pairs for `state`. Rows of `old` are reused for every site
+        whose epoch is unchanged, so only segments it hasn't seen are read. Chunks stored
+        before ingest counted tokens get their count here, so context packing never estimates.
+        """
+        empty = True
+        for site in SITES:
+            epoch, n = state[site]
+            items = OrderedDict()
+            seen = 0
+            prev = old.state.get(site) if old is not None else None
+            if prev and prev[0] == epoch and prev[1] <= n:
+                seen = prev[1]
+                for row in old.rows_of_site(site):
+                    items[old.doc_id(row)] = int(row)
+            for rec in iter_records(paths[site][seen:]):
+                apply_record(items, rec)
+            for rid, v in items.items():
+                rec = old.record(v) if isinstance(v, int) else v
+                if "id" not in rec:
+                    rec = dict(rec, id=rid)
+                empty = False
+                yield site, _with_tokens(rec)
+        if empty:
+            yield "", FALLBACK_DOC
+
+    def _segment_state(self) -> Tuple[Dict, Dict]:
+        stores = {site: SegmentStore(STORE_DIR, site) for site in SITES}
+        paths = {site: st.segment_paths() for site, st in stores.items()}
+        return {site: [stores[site].epoch, len(paths[site])] for site in SITES}, paths
+
+    def _attach(self, ds: Optional[ColumnarDocStore], state: Dict) -> bool:
+        """Use a published generation if it matches the store and has this model's embeddings."""
+        if ds is None or ds.state != state:
+            return False
+        emb = ds.embeddings(EMBEDDINGS_ID)
+        if emb is None:
+            return False
+        self.docstore, (self.doc_embs, info) = ds, emb
+        self.fingerprint = info["fingerprint"]
+        self.lexical_fingerprint = info["lexical_fingerprint"]
+        return True
+
+    def _sync_corpus(self) -> bool:
+        """
+        Attach to the current corpus generation, building it first if the store has moved on.
+        Only one process builds (under the docstore lock); the rest wait and attach. True if
+        the attached generation changed.
+        """
+        before = self.docstore.name if self.docstore is not None else None
+        state, paths = self._segment_state()
+        if not self._attach(ColumnarDocStore.open(DOCSTORE_DIR), state):
+            with ColumnarDocStore.build_lock(DOCSTORE_DIR):
+                current = ColumnarDocStore.open(DOCSTORE_DIR)
+                if not self._attach(current, state):  # nobody built it while we waited
+                    self._build_generation(current, state, paths)
+        return self.docstore.name != before
+
+    def _build_generation(self, current: Optional[ColumnarDocStore], state: Dict, paths: Dict):
+        if current is not None and current.state == state:
+            # rows are current, only this model's embeddings are missing; CURRENT stays untouched
+            ds = self._stage("docstore", current.fork)
+        else:
+            ds = self._stage("docstore", lambda: ColumnarDocStore.build(
+                DOCSTORE_DIR, self._records(state, paths, current), state, publish=False))
+        cache = self.emb_cache
+        # only new or changed chunks go through the model
+        self._stage("embeddings", lambda: cache.get_or_encode(ds.texts, self._encode, hashes=ds.content_hashes()))
+        ds.attach_embeddings(EMBEDDINGS_ID, cache.mat_path, fingerprint=cache.fingerprint,
+                             lexical_fingerprint=lexical_fingerprint(cache.keys), dim=int(cache.matrix.shape[1]))
+        ds.publish()
+        self._attach(ds, state)
 
     def _load(self):
-        paths = [os.path.join(STORE_DIR, "medlineplus.jsonl"),
-                 os.path.join(STORE_DIR, "cdc.jsonl")]
-        items = []
-        for p in paths:
-            items.extend(self._load_jsonl(p))
-        if not items:
-            # Fallback single doc prompting user to ingest data
-            self.docs = [Document(
-                page_content="No medical corpus found. Run the ingestion scripts to populate ./store/*.jsonl.",
-                metadata={"title": "Setup Required", "source": "system", "chunk_id": 0}
-            )]
-            self.doc_texts = [self.docs[0].page_content]
-            self.doc_embs = self.emb.encode(self.doc_texts, normalize_embeddings=True)
-            return
-
-        for d in items:
-            self.docs.append(Document(page_content=d.get("page_content", ""),
-                                      metadata=d.get("metadata", {})))
-            self.doc_texts.append(d.get("page_content", ""))
-
-        self.doc_embs = self.emb.encode(self.doc_texts, normalize_embeddings=True)
+        self._stage("model", self._load_model)
+        self._stage("corpus", self._sync_corpus)
+        self._build()
+
+    def _build(self):
+        with ColumnarDocStore.build_lock(DOCSTORE_DIR):  # ANN indexes are saved for the other workers too
+            self.index = self._stage("index", lambda: load_or_build(
+                resolve_kind(), self.doc_embs, INDEX_DIR, self.fingerprint))
+        self.lexical = self._load_lexical() if RETRIEVAL_MODE != "dense" else None
+        if self.lexical is not None:
+            add_known_words(self.lexical.terms)  # corpus words are real words, not condition typos
+        self.version = retrieval_version(self.fingerprint)
+
+    def corpus_changed(self) -> bool:
+        """Cheap check: has the store or the published generation moved past this instance?"""
+        if self.docstore is None:
+            return True
+        if ColumnarDocStore.current_name(DOCSTORE_DIR) != self.docstore.name:
+            return True
+        return self._segment_state()[0] != self.docstore.state
+
+    def refresh(self) -> bool:
+        """Pick up newly ingested segments without re-reading the whole store."""
+        if self._sync_corpus():
+            self._build()
+            return True
+        return False
+
+    def _load_lexical(self) -> BM25Index:
+        """Use the index built at ingest time if it matches this corpus, else rebuild it."""
+        fp = self.lexical_fingerprint
+
+        def saved() -> Optional[BM25Index]:
+            try:
+                index = BM25Index.load(LEXICAL_DIR)
+                return index if index.fingerprint == fp else None
+            except Exception:
+                return None
+
+        index = saved()
+        if index is None:
+            with ColumnarDocStore.build_lock(DOCSTORE_DIR):  # one worker rebuilds, the rest load it
+                index = saved()
+                if index is None:
+                    index = BM25Index.build(self.docstore.texts, fp)
+                    index.save(LEXICAL_DIR)
+        return index
 
     def reload(self):
-        # simple rebuild
-        self.__init__()
+        # simple rebuild; query vectors stay valid unless the model changed
+        self.__init__(query_cache=self.query_cache)
 
-    def retrieve(self, query: str, k: int = 6) -> List[Document]:
-        if self.doc_embs is None or not self.doc_texts:
+    def _dense(self, vec: np.ndarray, k: int) -> List[int]:
+        _, idx = self.index.search(vec[None, :], k)
+        return [int(i) for i in idx[0] if i >= 0]
+
+    def _search_lexical(self, query: str, vec: np.ndarray, k: int) -> List[int]:
+        with stage("bm25"):
+            cand, _ = self.lexical.search(query, LEXICAL_CANDIDATES)
+        if RETRIEVAL_MODE == "pruned":
+            if len(cand) < max(k, LEXICAL_MIN_HITS):
+                return self._dense(vec, k)  # too few lexical hits to trust the pruning
+            cand = np.sort(cand)  # ascending rows read the memory-mapped matrix in order
+            sims = np.asarray(self.doc_embs[cand]) @ vec
+            _, top = topk_rows(sims[None, :], k)
+            return cand[top[0]].tolist()
+        # hybrid: reciprocal rank fusion of the dense and BM25 rankings
+        depth = max(k, HYBRID_DEPTH)
+        fused = {}
+        for ranking in (self._dense(vec, depth), cand[:depth].tolist()):
+            for rank, i in enumerate(ranking):
+                fused[i] = fused.get(i, 0.0) + 1.0 / (RRF_K + rank + 1)
+        return sorted(fused, key=fused.get, reverse=True)[:k]
+
+    def _search(self, queries: List[str], q: np.ndarray, ks: List[int]) -> List[List[int]]:
+        with stage("search"):
+            if self.lexical is None:
+                _, idx = self.index.search(q, max(ks))
+                return [[int(i) for i in row[:k] if i >= 0] for row, k in zip(idx, ks)]
+            return [self._search_lexical(query, vec, k) for query, vec, k in zip(queries, q, ks)]
+
+    def retrieve(self, query: str, k: int = 6) -> List[DocView]:
+        if self.doc_embs is None or not len(self.docstore):
             return []
-        q = self.emb.encode([query], normalize_embeddings=True)[0]
-        sims = np.dot(self.doc_embs, q)
-        idx = np.argsort(-sims)[:k]
-        return [self.docs[i] for i in idx]
+        q = self.embed_queries([query])
+        return [self.docstore.view(i) for i in self._search([query], q, [k])[0]]
+
+    def retrieve_batch(self, queries: List[str], ks: List[int]) -> List[List[DocView]]:
+        """One encode call and one index search for many queries; each keeps its own k."""
+        if self.doc_embs is None or not len(self.docstore) or not queries:
+            return [[] for _ in queries]
+        q = self.embed_queries(queries)
+        return [[self.docstore.view(i) for i in row] for row in self._search(queries, q, ks)]
 
-retriever_singleton = Retriever()
+_retriever: Optional[Retriever] = None
+_warming: Optional[Retriever] = None  # the instance being built, for readiness reporting
+_warm_error: Optional[str] = None
+_lock = threading.Lock()
 
-def format_context(docs: List[Document]) -> str:
-    parts = []
+def get_retriever() -> Retriever:
+    """The process-wide Retriever, built on first use (or ahead of time by warm_up)."""
+    global _retriever, _warming, _warm_error
+    if _retriever is not None:
+        return _retriever
+    with _lock:
+        if _retriever is None:
+            _warming = Retriever(load=False)
+            try:
+                _warming._load()
+            except Exception as e:
+                _warm_error = f"{type(e).__name__}: {e}"
+                raise
+            _retriever, _warm_error = _warming, None
+    return _retriever
+
+def refresh_retriever() -> bool:
+    """
+    Swap in a Retriever for the newest corpus generation, reusing the loaded model and
+    query cache. Requests keep whichever instance they started with, so none sees a
+    half-updated one. True if swapped.
+    """
+    global _retriever
+    with _lock:
+        old = _retriever
+        if old is None or not old.corpus_changed():
+            return False
+        new = Retriever(query_cache=old.query_cache, load=False)
+        new.emb = old.emb
+        new._stage("corpus", new._sync_corpus)
+        new._build()
+        _retriever = new
+    return True
+
+def watch_corpus(interval_s: float) -> threading.Thread:
+    """Poll for new corpus generations (built by any process) and switch to them."""
+    def run():
+        while True:
+            time.sleep(interval_s)
+            try:
+                refresh_retriever()
+            except Exception as e:
+                print(f"[warn] corpus refresh failed: {e}")
+    t = threading.Thread(target=run, name="corpus-watch", daemon=True)
+    t.start()
+    return t
+
+def current_retriever() -> Optional[Retriever]:
+    """The built Retriever, or None while it is still warming up (never blocks)."""
+    return _retriever
+
+def warm_up() -> threading.Thread:
+    """Build the Retriever on a daemon thread so startup and liveness don't wait for it."""
+    def run():
+        try:
+            get_retriever()
+        except Exception:
+            pass  # reported by readiness(); the next request retries
+    t = threading.Thread(target=run, name="retriever-warmup", daemon=True)
+    t.start()
+    return t
+
+def readiness() -> Dict:
+    r = _retriever or _warming
+    status = r.status() if r is not None else \
+        {"model_loaded": False, "docstore_loaded": False, "index_built": False, "chunks": 0,
+         "corpus_version": "", "stages_s": {}}
+    status["ready"] = _retriever is not None
+    status["error"] = _warm_error
+    return status
+
+def __getattr__(name: str):
+    # `from app.rag import retriever_singleton` still works, but builds on first access
+    if name == "retriever_singleton":
+        return get_retriever()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def pack_context(docs: List[DocView], budget: int = CONTEXT_TOKEN_BUDGET) -> Tuple[List[DocView], int]:
+    """
+    Best-ranked chunks that fit in `budget` tokens, in rank order, and the tokens used. A chunk
+    that doesn't fit is skipped so a smaller, lower-ranked one can still go in. Counts come from
+    ingest (DocView.tokens), so nothing is tokenized here.
+    """
+    packed, used = [], 0
     for d in docs:
-        m = d.metadata or {}
-        title = m.get("title", "Source")
-        src = m.get("source", "")
-        parts.append(f"[{title}]({src}) :: {d.page_content}")
-    return "\n\n---\n\n".join(parts)
+        cost = d.tokens + CONTEXT_CHUNK_OVERHEAD
+        if budget and used + cost > budget:
+            continue
+        packed.append(d)
+        used += cost
+    return packed, used
+
+def format_context(docs: List[DocView], budget: int = CONTEXT_TOKEN_BUDGET) -> str:
+    """Prompt context for a synthesizer; only built when a synthesizer asks for it."""
+    with stage("format_context"):
+        parts = []
+        for d in pack_context(docs, budget)[0]:
+            m = d.metadata or {}
+            title = m.get("title", "Source")
+            src = m.get("source", "")
+            parts.append(f"[{title}]({src}) :: {d.page_content}")
+        return "\n\n---\n\n".join(parts)
 
-def synthesize_answer(query: str, docs: List[Document], system_prompt: str) -> str:
+def synthesize_answer(query: str, docs: List[DocView], system_prompt: str) -> str:
+    # A model-backed synthesizer builds its prompt from format_context(docs), which packs the
+    # chunks into CONTEXT_TOKEN_BUDGET; this template doesn't read them, so no context is built.
     # Provide general health guidance without citing irrelevant sources
     import textwrap
     body = (
@@ -0,0 +1,171 @@
+# app/response_cache.py
+"""
+Response cache in front of /ask. An answer is a function of the normalized query,
+top_k, voice and the corpus version (Retriever.version), so that tuple is the key.
+Entries from an older corpus version are dropped the first time a newer version is seen.
+
+Backends: `memory` (per-process LRU) or `disk` (sqlite file, shared by workers on one host).
+Concurrent identical misses in one process wait for a single computation.
+"""
+import asyncio, hashlib, json, os, sqlite3, threading, time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+RESPONSE_CACHE = os.getenv("RESPONSE_CACHE", "memory")  # memory | disk | off
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))  # entries
+RESPONSE_CACHE_TTL_S = float(os.getenv("RESPONSE_CACHE_TTL_S", "600"))
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH",
+                                os.path.join(os.getenv("STORE_DIR", "./store"), ".response_cache.sqlite"))
+
+def cache_key(version: str, query: str, top_k: int, voice: bool) -> str:
+    return hashlib.sha1(json.dumps([version, query, top_k, voice]).encode("utf-8")).hexdigest()
+
+class MemoryBackend:
+    def __init__(self, maxsize: int, ttl_s: float):
+        self.maxsize, self.ttl_s = maxsize, ttl_s
+        self.version = ""
+        self._data: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def set_version(self, version: str):
+        with self._lock:
+            if version != self.version:
+                self._data.clear()
+                self.version = version
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            if item[0] < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return item[1]
+
+    def put(self, key: str, value: dict):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_s, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+class DiskBackend:
+    """sqlite table of JSON responses; LRU by last access, expiry by wall clock."""
+
+    def __init__(self, path: str, maxsize: int, ttl_s: float):
+        self.maxsize, self.ttl_s = maxsize, ttl_s
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS responses ("
+                        " key TEXT PRIMARY KEY, expires REAL, accessed REAL, value TEXT)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self._lock = threading.Lock()
+
+    def set_version(self, version: str):
+        # shared by every worker: only the first to see a new corpus clears it
+        with self._lock:
+            row = self.db.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+            if row is None or row[0] != version:
+                self.db.execute("DELETE FROM responses")
+                self.db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (version,))
+
+    def get(self, key: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            row = self.db.execute("SELECT expires, value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[0] < now:
+                self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self.db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(row[1])
+
+    def put(self, key: str, value: dict):
+        now = time.time()
+        with self._lock:
+            self.db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                            (key, now + self.ttl_s, now, json.dumps(value)))
+            excess = len(self) - self.maxsize
+            if excess > 0:
+                self.db.execute("DELETE FROM responses WHERE key IN "
+                                "(SELECT key FROM responses ORDER BY accessed LIMIT ?)", (excess,))
+
+    def clear(self):
+        with self._lock:
+            self.db.execute("DELETE FROM responses")
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+class ResponseCache:
+    def __init__(self, backend, version: str = ""):
+        self.backend = backend
+        self.version = version
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0  # misses that waited on an identical in-flight request
+
+    def _check_version(self, version: str):
+        if version != self.version:
+            self.backend.set_version(version)
+            self._inflight.clear()
+            self.version = version
+
+    async def get_or_compute(self, version: str, key: str,
+                             compute: Callable[[], Awaitable[dict]]) -> Tuple[dict, bool]:
+        """Cached value for `key` under corpus `version`, or compute it once; returns (value, hit)."""
+        self._check_version(version)
+        value = self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return dict(value), True
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.coalesced += 1
+            return dict(await asyncio.shield(fut)), True
+        self.misses += 1
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            value = await compute()
+            if self.version == version:  # don't store answers from a corpus that was swapped meanwhile
+                self.backend.put(key, value)
+            fut.set_result(value)
+        except Exception as e:
+            fut.set_exception(e)
+            fut.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            if self._inflight.get(key) is fut:
+                del self._inflight[key]
+            if not fut.done():
+                fut.cancel()  # this request was cancelled; waiters see it too
+        return dict(value), False
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> Dict:
+        return {"size": len(self.backend), "hits": self.hits, "misses": self.misses,
+                "coalesced": self.coalesced, "version": self.version}
+
+def make_cache(kind: str = RESPONSE_CACHE) -> Optional[ResponseCache]:
+    if kind == "off" or RESPONSE_CACHE_SIZE <= 0:
+        return None
+    if kind == "disk":
+        return ResponseCache(DiskBackend(RESPONSE_CACHE_PATH, RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL_S))
+    if kind == "memory":
+        return ResponseCache(MemoryBackend(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL_S))
+    raise ValueError(f"unknown RESPONSE_CACHE: {kind}")
@@ -6,6 +6,10 @@ class AskRequest(BaseModel):
     top_k: int = 6
     use_reranker: bool = True
     voice: bool = False  # triggers TTS in /ask
+    debug: bool = False  # adds per-stage timings to the response
+
+class AskBatchRequest(BaseModel):
+    requests: List[AskRequest]
 
 class Source(BaseModel):
     title: str
@@ -0,0 +1,94 @@
+# bench/corpus.py
+"""
+Synthetic corpora for the benchmarks, in the legacy store/<site>.jsonl format that
+SegmentStore adopts as its first segment. Word frequencies follow a Zipf curve over a
+vocabulary seeded with the condition keywords, so BM25 postings and query overlap look
+roughly like the real store. Deterministic for a given (n_chunks, seed).
+
+  <root>/medlineplus.jsonl, <root>/cdc.jsonl   chunk records, split evenly
+  <root>/queries.jsonl                         {"query": ..., "source": ...} probes
+  <root>/bench_corpus.json                     what was generated, to skip regeneration
+"""
+import hashlib, json, os, shutil
+from typing import List
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SITE_HOSTS = {"medlineplus": "https://medlineplus.gov", "cdc": "https://www.cdc.gov"}
+CHUNK_WORDS = 120
+CHUNKS_PER_PAGE = 8
+BLOCK = 10_000
+
+def vocabulary(size: int = 20_000, seed: int = 0) -> List[str]:
+    words = []
+    with open(os.path.join(ROOT, "app", "data", "conditions.json"), "r", encoding="utf-8") as f:
+        for cond in json.load(f).values():
+            for kw in cond.get("keywords", []):
+                words.extend(w for w in kw.lower().split() if w.isalpha())
+    words = list(dict.fromkeys(words))
+    rng = np.random.default_rng(seed)
+    syllables = ["ab", "ca", "de", "fi", "go", "hu", "ka", "le", "mi", "no", "pu", "ra", "se", "ti", "vo", "xe"]
+    seen = set(words)
+    while len(words) < size:
+        w = "".join(rng.choice(syllables, size=rng.integers(2, 5)))
+        if w not in seen:
+            seen.add(w)
+            words.append(w)
+    return words[:size]
+
+def parse_size(s: str) -> int:
+    s = s.strip().lower()
+    mult = {"k": 1_000, "m": 1_000_000}.get(s[-1], 1)
+    return int(float(s[:-1] if s[-1] in "km" else s) * mult)
+
+def generate(root: str, n_chunks: int, seed: int = 0, n_queries: int = 500) -> dict:
+    """Write the corpus unless an identical one is already there; returns its description."""
+    spec = {"n_chunks": n_chunks, "seed": seed, "chunk_words": CHUNK_WORDS, "n_queries": n_queries}
+    marker = os.path.join(root, "bench_corpus.json")
+    if os.path.exists(marker):
+        with open(marker, "r", encoding="utf-8") as f:
+            if json.load(f) == spec:
+                return spec
+    os.makedirs(root, exist_ok=True)
+    vocab = np.array(vocabulary(seed=seed))
+    p = 1.0 / np.arange(1, len(vocab) + 1)
+    p /= p.sum()
+    rng = np.random.default_rng(seed)
+    sites = list(SITE_HOSTS)
+    per_site = {site: n_chunks // len(sites) + (i < n_chunks % len(sites)) for i, site in enumerate(sites)}
+    probes = set(rng.choice(n_chunks, size=min(n_queries, n_chunks), replace=False).tolist())
+    queries = []
+    row = 0
+    for site, count in per_site.items():
+        with open(os.path.join(root, f"{site}.jsonl"), "w", encoding="utf-8") as f:
+            for start in range(0, count, BLOCK):
+                words = vocab[rng.choice(len(vocab), size=(min(BLOCK, count - start), CHUNK_WORDS), p=p)]
+                for j, ws in enumerate(words):
+                    i = start + j
+                    page, chunk_id = divmod(i, CHUNKS_PER_PAGE)
+                    source = f"{SITE_HOSTS[site]}/bench/{page}.html"
+                    text = " ".join(ws)
+                    f.write(json.dumps({
+                        "id": hashlib.md5(f"{source}-{chunk_id}".encode()).hexdigest(),
+                        "page_content": text,
+                        "metadata": {"source": source, "title": f"Bench page {page}", "chunk_id": chunk_id},
+                    }) + "\n")
+                    if row in probes:
+                        lo = int(rng.integers(0, CHUNK_WORDS - 8))
+                        queries.append({"query": " ".join(ws[lo:lo + 8]), "source": source})
+                    row += 1
+    with open(os.path.join(root, "queries.jsonl"), "w", encoding="utf-8") as f:
+        for q in queries:
+            f.write(json.dumps(q) + "\n")
+    # a regenerated corpus invalidates every derived cache in this directory
+    for sub in (".emb_cache", ".index", ".docstore", ".lexical"):
+        path = os.path.join(root, sub)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+    with open(marker, "w", encoding="utf-8") as f:
+        json.dump(spec, f)
+    return spec
+
+def load_queries(root: str) -> List[str]:
+    with open(os.path.join(root, "queries.jsonl"), "r", encoding="utf-8") as f:
+        return [json.loads(line)["query"] for line in f if line.strip()]
@@ -0,0 +1,47 @@
+# bench/import_time.py
+"""
+Import-time check for the API module. Runs `python -X importtime -c "import app.api"`
+in a fresh interpreter, reports the slowest modules and fails if the import pulls in
+the model stack or exceeds the budget.
+
+  python bench/import_time.py --budget-ms 1500
+"""
+import argparse, json, os, re, subprocess, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# must only load during warm-up, never at import
+FORBIDDEN = ("torch", "sentence_transformers", "transformers", "onnxruntime")
+_LINE_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+def measure(module: str = "app.api") -> dict:
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=ROOT, capture_output=True, text=True,
+                          env={**os.environ, "PYTHONPATH": ROOT + os.pathsep + os.environ.get("PYTHONPATH", "")})
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+    mods = {}
+    for line in proc.stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if m:
+            mods[m.group(4)] = int(m.group(2))  # cumulative microseconds
+    top = sorted(((name, us) for name, us in mods.items() if "." not in name), key=lambda x: -x[1])
+    return {
+        "module": module,
+        "total_ms": round(mods.get(module, 0) / 1000, 1),
+        "top_ms": {name: round(us / 1000, 1) for name, us in top[:10]},
+        "forbidden": sorted(m for m in mods if m.split(".")[0] in FORBIDDEN and "." not in m),
+    }
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--module", default="app.api")
+    ap.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", "1500")))
+    args = ap.parse_args()
+
+    report = measure(args.module)
+    report["budget_ms"] = args.budget_ms
+    print(json.dumps(report, indent=1))
+    if report["forbidden"]:
+        sys.exit(f"[fail] {args.module} imports {', '.join(report['forbidden'])} at import time")
+    if report["total_ms"] > args.budget_ms:
+        sys.exit(f"[fail] importing {args.module} took {report['total_ms']} ms (budget {args.budget_ms} ms)")
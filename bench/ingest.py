@@ -0,0 +1,54 @@
+# bench/ingest.py
+"""
+Throughput of the per-page ingest work (clean_html, chunk_text) on synthetic pages
+shaped like MedlinePlus/CDC articles: boilerplate nav/header/footer/script around
+a few thousand words of paragraphs and lists.
+"""
+import json, time
+from typing import Dict, List
+import numpy as np
+
+from bench.corpus import vocabulary
+from data_ingest.common import chunk_text, clean_html
+
+def synthetic_pages(n: int, words: int = 1500, seed: int = 0) -> List[str]:
+    vocab = np.array(vocabulary(seed=seed))
+    p = 1.0 / np.arange(1, len(vocab) + 1)
+    p /= p.sum()
+    rng = np.random.default_rng(seed)
+    nav = "".join(f'<li><a href="/topic/{i}">{w}</a></li>' for i, w in enumerate(vocab[:60]))
+    pages = []
+    for i in range(n):
+        ws = vocab[rng.choice(len(vocab), size=words, p=p)]
+        paras = [" ".join(ws[j:j + 60]) for j in range(0, words, 60)]
+        body = "".join(f"<h2>{para[:30]}</h2><p>{para}</p>" if k % 5 == 0 else f"<p>{para}</p>"
+                       for k, para in enumerate(paras))
+        pages.append(
+            f"<html><head><title>Page {i}</title><style>p{{margin:0}}</style>"
+            f"<script>var x = {i};</script></head><body><header>Site header</header>"
+            f"<nav><ul>{nav}</ul></nav><main><article>{body}</article></main>"
+            f"<aside>Related</aside><footer>Footer text</footer></body></html>")
+    return pages
+
+def run(pages: int = 200, repeat: int = 3) -> Dict:
+    html = synthetic_pages(pages)
+    mb = sum(len(h.encode("utf-8")) for h in html) / 2**20
+    best_clean, texts = float("inf"), []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        texts = [clean_html(h) for h in html]
+        best_clean = min(best_clean, time.perf_counter() - t0)
+    best_chunk, chunks = float("inf"), 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        chunks = sum(len(chunk_text(t, source=f"https://bench/{i}", title="t")) for i, t in enumerate(texts))
+        best_chunk = min(best_chunk, time.perf_counter() - t0)
+    return {
+        "pages": pages,
+        "html_mb": round(mb, 2),
+        "clean_html": {"pages_per_s": round(pages / best_clean, 1), "mb_per_s": round(mb / best_clean, 2)},
+        "chunk_text": {"pages_per_s": round(pages / best_chunk, 1), "chunks_per_s": round(chunks / best_chunk, 1)},
+    }
+
+if __name__ == "__main__":
+    print(json.dumps(run()))
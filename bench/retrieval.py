@@ -0,0 +1,166 @@
+# bench/retrieval.py
+"""
+One retrieval benchmark run against one corpus directory, in its own process so memory
+numbers are per worker. Prints a single JSON object on the last stdout line.
+
+  python -m bench.retrieval --store bench/data/10k [--encoder hash|model] [--cold]
+
+The default `hash` encoder is a deterministic feature-hashing stand-in with the model's
+dimension, so large corpora measure the store, cache and index rather than the transformer.
+"""
+import argparse, asyncio, json, os, resource, shutil, sys, time, zlib
+from typing import Dict, List
+import numpy as np
+
+HASH_DIM = 384
+
+class HashEncoder:
+    """SentenceTransformer-shaped `encode` over hashed word features."""
+
+    def __init__(self, dim: int = HASH_DIM):
+        self.dim = dim
+        self._slots: Dict[str, tuple] = {}
+
+    def _slot(self, word: str) -> tuple:
+        slot = self._slots.get(word)
+        if slot is None:
+            h = zlib.crc32(word.encode("utf-8"))
+            slot = self._slots[word] = (h % self.dim, 1.0 if (h >> 16) & 1 else -1.0)
+        return slot
+
+    def encode(self, texts, normalize_embeddings: bool = False, **kw) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, t in enumerate(texts):
+            row = out[i]
+            for w in t.lower().split():
+                j, s = self._slot(w)
+                row[j] += s
+        if normalize_embeddings:
+            n = np.linalg.norm(out, axis=1, keepdims=True)
+            n[n == 0] = 1.0
+            out /= n
+        return out
+
+def percentiles(samples_s: List[float]) -> Dict[str, float]:
+    a = np.asarray(samples_s) * 1000.0
+    return {"p50_ms": round(float(np.percentile(a, 50)), 3), "p95_ms": round(float(np.percentile(a, 95)), 3),
+            "p99_ms": round(float(np.percentile(a, 99)), 3), "mean_ms": round(float(a.mean()), 3)}
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20, 1)
+
+def peak_rss_mb() -> float:
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)  # KiB on Linux
+
+async def ask_load(queries: List[str], requests: int, concurrency: int, top_k: int) -> dict:
+    import httpx
+    from app.api import app
+
+    sem = asyncio.Semaphore(concurrency)
+    lat, errors = [], 0
+
+    async def one(client, q):
+        nonlocal errors
+        async with sem:
+            t0 = time.perf_counter()
+            r = await client.post("/ask", json={"query": q, "top_k": top_k})
+            lat.append(time.perf_counter() - t0)
+            errors += r.status_code != 200
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        await one(client, queries[0])  # warm the batcher and the route
+        lat.clear()
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(client, queries[i % len(queries)]) for i in range(requests)))
+        wall = time.perf_counter() - t0
+    return {"requests": requests, "concurrency": concurrency, "errors": errors,
+            "rps": round(requests / wall, 1), **percentiles(lat)}
+
+def main():
+    ap = argparse.ArgumentParser(description="Retriever build / retrieve / /ask benchmark for one corpus")
+    ap.add_argument("--store", required=True)
+    ap.add_argument("--encoder", choices=["hash", "model"], default="hash")
+    ap.add_argument("--cold", action="store_true", help="drop embedding/index/docstore caches first")
+    ap.add_argument("--queries", type=int, default=500)
+    ap.add_argument("--k", type=int, default=6)
+    ap.add_argument("--requests", type=int, default=1000)
+    ap.add_argument("--concurrency", type=int, default=32)
+    args = ap.parse_args()
+
+    store = os.path.abspath(args.store)
+    if args.cold:
+        for sub in (".emb_cache", ".index", ".docstore", ".lexical"):
+            shutil.rmtree(os.path.join(store, sub), ignore_errors=True)
+    # app.rag reads its configuration at import
+    os.environ["STORE_DIR"] = store
+    for var, sub in (("EMB_CACHE_DIR", ".emb_cache"), ("INDEX_DIR", ".index"),
+                     ("DOCSTORE_DIR", ".docstore"), ("LEXICAL_DIR", ".lexical")):
+        os.environ[var] = os.path.join(store, sub)
+    if args.encoder == "hash":
+        os.environ["EMBEDDINGS_MODEL"] = f"bench-hash-{HASH_DIM}"
+    os.environ["WARMUP_ON_START"] = "0"
+    # queries repeat across the load loop; cached answers would inflate /ask rps and latency
+    os.environ.setdefault("RESPONSE_CACHE", "off")
+
+    import app.rag as rag
+    from bench.corpus import load_queries
+
+    class BenchRetriever(rag.Retriever):
+        def _load_model(self):
+            if args.encoder == "hash":
+                self.emb = HashEncoder()
+            else:
+                super()._load_model()
+
+    queries = load_queries(store)[:args.queries]
+    rss_before = rss_mb()
+    t0 = time.perf_counter()
+    r = BenchRetriever()
+    build_s = time.perf_counter() - t0
+    stages = dict(r.stages)
+    del r
+    t0 = time.perf_counter()
+    r = BenchRetriever()  # everything cached on disk now
+    warm_build_s = time.perf_counter() - t0
+
+    for q in queries[:20]:
+        r.retrieve(q, k=args.k)
+    r.query_cache.clear()
+    lat = []
+    for q in queries:
+        t0 = time.perf_counter()
+        r.retrieve(q, k=args.k)
+        lat.append(time.perf_counter() - t0)
+    cached = []
+    for q in queries:
+        t0 = time.perf_counter()
+        r.retrieve(q, k=args.k)
+        cached.append(time.perf_counter() - t0)
+    r.query_cache.clear()
+    t0 = time.perf_counter()
+    for i in range(0, len(queries), 32):
+        batch = queries[i:i + 32]
+        r.retrieve_batch(batch, [args.k] * len(batch))
+    batch_qps = len(queries) / (time.perf_counter() - t0)
+
+    rag._retriever = r  # serve /ask from the instance already built
+    r.query_cache.clear()
+    ask = asyncio.run(ask_load(queries, args.requests, args.concurrency, args.k))
+
+    print(json.dumps({
+        "chunks": len(r.docstore),
+        "encoder": args.encoder,
+        "index": r.index.kind,
+        "build_s": round(build_s, 3),
+        "build_stages_s": stages,
+        "warm_build_s": round(warm_build_s, 3),
+        "retrieve": percentiles(lat),
+        "retrieve_cached": percentiles(cached),
+        "retrieve_batch_qps": round(batch_qps, 1),
+        "ask": ask,
+        "memory": {"rss_mb": rss_mb(), "rss_delta_mb": round(rss_mb() - rss_before, 1), "peak_rss_mb": peak_rss_mb()},
+    }))
+
+if __name__ == "__main__":
+    sys.exit(main())
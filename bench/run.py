@@ -0,0 +1,131 @@
+# bench/run.py
+"""
+Performance benchmark suite.
+
+  python -m bench.run --sizes 10k,100k,1m            # run, write bench/results/latest.json
+  python -m bench.run --sizes 10k --save-baseline    # ...and make it the new baseline
+  python -m bench.run --sizes 10k --fail-on-regression
+
+Each corpus size is generated once under bench/data/<size> and benchmarked in its own
+process (see bench/retrieval.py). Results are compared metric by metric against
+bench/baseline.json; changes beyond --threshold in the bad direction are regressions.
+"""
+import argparse, json, os, platform, subprocess, sys, time
+from typing import Dict, Iterator, Tuple
+
+from bench import ingest
+from bench.corpus import generate, parse_size
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+DATA_DIR = os.path.join(BENCH_DIR, "data")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+# settings that change what a number means; recorded with every run
+CONFIG_VARS = ("EMBEDDINGS_BACKEND", "RETRIEVAL_INDEX", "INDEX_SHARDS", "EMB_PRECISION", "RETRIEVAL_MODE",
+               "QUERY_CACHE_SIZE", "RESPONSE_CACHE", "BATCH_WINDOW_MS", "BATCH_MAX_SIZE", "OMP_NUM_THREADS",
+               "OPENBLAS_NUM_THREADS")
+
+def run_retrieval(store: str, args) -> Dict:
+    cmd = [sys.executable, "-m", "bench.retrieval", "--store", store, "--encoder", args.encoder,
+           "--requests", str(args.requests), "--concurrency", str(args.concurrency)]
+    if args.cold:
+        cmd.append("--cold")
+    proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"bench.retrieval failed for {store}:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def environment() -> Dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    import numpy
+    return {"python": platform.python_version(), "numpy": numpy.__version__, "platform": platform.platform(),
+            "cpus": os.cpu_count(), "commit": commit, "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "config": {v: os.environ[v] for v in CONFIG_VARS if v in os.environ}}
+
+def _flatten(d: Dict, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    for k, v in d.items():
+        key = f"{prefix}.{k}" if prefix else k
+        if isinstance(v, dict):
+            yield from _flatten(v, key)
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            yield key, float(v)
+
+def _higher_is_better(key: str):
+    name = key.rsplit(".", 1)[-1]
+    if name.endswith(("_per_s", "qps", "rps")):
+        return True
+    if name.endswith(("_ms", "_s", "_mb")):
+        return False
+    return None  # counts and settings, not compared
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> Dict:
+    base = dict(_flatten(baseline.get("results", {})))
+    out = {"regressions": [], "improvements": [], "compared": 0}
+    for key, value in _flatten(current.get("results", {})):
+        better_up = _higher_is_better(key)
+        old = base.get(key)
+        if better_up is None or not old:
+            continue
+        out["compared"] += 1
+        change = (value - old) / old
+        entry = {"metric": key, "baseline": old, "current": value, "change": round(change, 3)}
+        if (change < -threshold) if better_up else (change > threshold):
+            out["regressions"].append(entry)
+        elif (change > threshold) if better_up else (change < -threshold):
+            out["improvements"].append(entry)
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description="Retrieval, ingest and /ask benchmarks")
+    ap.add_argument("--sizes", default="10k", help="comma-separated chunk counts, e.g. 10k,100k,1m")
+    ap.add_argument("--encoder", choices=["hash", "model"], default="hash")
+    ap.add_argument("--cold", action="store_true", help="rebuild embeddings/index/docstore for every size")
+    ap.add_argument("--requests", type=int, default=1000)
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--ingest-pages", type=int, default=200)
+    ap.add_argument("--out", default=os.path.join(RESULTS_DIR, "latest.json"))
+    ap.add_argument("--baseline", default=BASELINE)
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--threshold", type=float, default=0.10, help="relative change counted as a regression")
+    ap.add_argument("--fail-on-regression", action="store_true")
+    args = ap.parse_args()
+    os.environ.setdefault("RESPONSE_CACHE", "off")  # measure /ask itself; recorded in env.config
+
+    results = {"retrieval": {}, "ingest": {}}
+    for label in [s.strip() for s in args.sizes.split(",") if s.strip()]:
+        store = os.path.join(DATA_DIR, label)
+        t0 = time.perf_counter()
+        generate(store, parse_size(label))
+        print(f"[..] {label}: corpus ready in {time.perf_counter() - t0:.1f}s, benchmarking", file=sys.stderr)
+        results["retrieval"][label] = run_retrieval(store, args)
+    results["ingest"] = ingest.run(pages=args.ingest_pages)
+
+    report = {"env": environment(), "results": results}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            report["comparison"] = compare(report, json.load(f), args.threshold)
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"env": report["env"], "results": results}, f, indent=1)
+
+    print(json.dumps(results, indent=1))
+    cmp_ = report.get("comparison")
+    if cmp_:
+        for kind, mark in (("regressions", "[regressed]"), ("improvements", "[improved]")):
+            for e in cmp_[kind]:
+                print(f"{mark} {e['metric']}: {e['baseline']} -> {e['current']} ({e['change']:+.1%})")
+        print(f"[ok] compared {cmp_['compared']} metrics against {args.baseline}")
+        if args.fail_on_regression and cmp_["regressions"]:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,13 @@
 import re, hashlib
+from functools import lru_cache
 from bs4 import BeautifulSoup
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+try:
+    from token_count import count_tokens  # run as an ingest script
+except ImportError:
+    from data_ingest.token_count import count_tokens
+
 def clean_html(html: str) -> str:
     soup = BeautifulSoup(html, "lxml")
     # Remove nav/aside/script/style
@@ -11,15 +17,19 @@ def clean_html(html: str) -> str:
     # Normalize whitespace
     return re.sub(r"\n{2,}", "\n", text).strip()
 
+@lru_cache(maxsize=8)
+def _splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    # built once per process and settings, not once per page
+    return RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
 def chunk_text(text: str, source: str, title: str, chunk_size=800, chunk_overlap=120):
-    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-    chunks = splitter.split_text(text)
+    chunks = _splitter(chunk_size, chunk_overlap).split_text(text)
     docs = []
     for i, c in enumerate(chunks):
         uid = hashlib.md5(f"{source}-{i}".encode()).hexdigest()
         docs.append({
             "id": uid,
             "page_content": c,
-            "metadata": {"source": source, "title": title, "chunk_id": i}
+            "metadata": {"source": source, "title": title, "chunk_id": i, "tokens": count_tokens(c)}
         })
     return docs
@@ -0,0 +1,156 @@
+# data_ingest/crawler.py
+import asyncio, random, time
+from concurrent.futures import Executor
+from typing import AsyncIterator, Callable, Dict, Iterable, NamedTuple, Optional
+from urllib.parse import urlsplit
+import httpx
+
+from fetch_cache import FetchCache, body_hash
+
+UA = {"User-Agent": "MedicalRAGBot/0.1 (github.com/Sarayu-code/Medical-RAG-Assistant)"}
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+class CrawlResult(NamedTuple):
+    url: str
+    status: str                        # "changed" | "fresh" | "revalidated" | "failed"
+    value: object = None               # process(url, html) result, or the exception if failed
+    validators: Optional[Dict] = None  # save to the FetchCache once the page is persisted
+
+class TokenBucket:
+    """Allows `rate` requests per second on average with bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return  # unlimited
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class AsyncCrawler:
+    """
+    Fetches many URLs over one pooled httpx.AsyncClient.
+
+    - at most `concurrency` requests in flight overall
+    - per-domain token buckets (`per_domain_rps`, `burst`) instead of fixed sleeps
+    - retries on transport errors and 429/5xx with exponential backoff + jitter,
+      honouring Retry-After when the server sends one
+    - `process(url, html)` runs in `executor` so parsing overlaps with network I/O;
+      at most `max_pending` pages are fetched-or-processing at once, which bounds memory
+
+    With a FetchCache, pages still fresh are skipped, others are requested
+    conditionally, and 304s or identical bodies never reach `process`.
+
+    Pass `client` to reuse an existing client (e.g. one pointed at a local test server).
+    """
+
+    def __init__(self, concurrency: int = 8, per_domain_rps: float = 2.0, burst: int = 2,
+                 retries: int = 3, backoff_s: float = 0.5, timeout: float = 30.0,
+                 client: Optional[httpx.AsyncClient] = None, executor: Optional[Executor] = None,
+                 max_pending: int = 0):
+        self.concurrency = concurrency
+        self.per_domain_rps = per_domain_rps
+        self.burst = burst
+        self.retries = retries
+        self.backoff_s = backoff_s
+        self.timeout = timeout
+        self.executor = executor
+        self.max_pending = max_pending or 4 * concurrency
+        self._client = client
+        self._own_client = client is None
+        self._sem = None
+        self._pending = None
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    async def __aenter__(self):
+        if self._client is None:
+            limits = httpx.Limits(max_connections=self.concurrency,
+                                  max_keepalive_connections=self.concurrency)
+            self._client = httpx.AsyncClient(headers=UA, timeout=self.timeout,
+                                             follow_redirects=True, limits=limits)
+        self._sem = asyncio.Semaphore(self.concurrency)
+        self._pending = asyncio.Semaphore(self.max_pending)
+        return self
+
+    async def __aexit__(self, *exc):
+        if self._own_client and self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _bucket(self, url: str) -> TokenBucket:
+        domain = urlsplit(url).netloc
+        if domain not in self._buckets:
+            self._buckets[domain] = TokenBucket(self.per_domain_rps, self.burst)
+        return self._buckets[domain]
+
+    def _delay(self, attempt: int, resp: Optional[httpx.Response]) -> float:
+        if resp is not None:
+            retry_after = resp.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                return float(retry_after)
+        return self.backoff_s * (2 ** attempt) * (0.5 + random.random())
+
+    async def fetch(self, url: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """GET with rate limiting and retries; raises httpx errors like client.get would."""
+        for attempt in range(self.retries + 1):
+            resp = None
+            # wait for the domain's turn before taking a slot, so one slow domain can't hold them all
+            await self._bucket(url).acquire()
+            async with self._sem:
+                try:
+                    resp = await self._client.get(url, headers=headers)
+                except httpx.TransportError:
+                    if attempt == self.retries:
+                        raise
+            if resp is not None and resp.status_code not in RETRY_STATUS:
+                return resp
+            if attempt == self.retries:
+                resp.raise_for_status()
+            await asyncio.sleep(self._delay(attempt, resp))
+        raise RuntimeError("unreachable")
+
+    async def _one(self, url: str, process: Callable[[str, str], object],
+                   cache: Optional[FetchCache]) -> CrawlResult:
+        async with self._pending:
+            try:
+                entry = cache.get(url) if cache else None
+                if cache and cache.is_fresh(entry):
+                    return CrawlResult(url, "fresh")
+                headers = cache.conditional_headers(entry) if cache else None
+                resp = await self.fetch(url, headers=headers)
+                if resp.status_code == 304 and entry:
+                    return CrawlResult(url, "revalidated",
+                                       validators=FetchCache.validators(resp.headers, entry["body_hash"], entry))
+                resp.raise_for_status()
+                digest = body_hash(resp.content)
+                validators = FetchCache.validators(resp.headers, digest)
+                if entry and entry["body_hash"] == digest:
+                    return CrawlResult(url, "revalidated", validators=validators)
+                loop = asyncio.get_running_loop()
+                value = await loop.run_in_executor(self.executor, process, url, resp.text)
+                return CrawlResult(url, "changed", value, validators)
+            except Exception as e:
+                return CrawlResult(url, "failed", e)
+
+    async def crawl(self, urls: Iterable[str], process: Callable[[str, str], object],
+                    cache: Optional[FetchCache] = None) -> AsyncIterator[CrawlResult]:
+        """Yield a CrawlResult per URL as pages finish, in completion order."""
+        tasks = [asyncio.ensure_future(self._one(u, process, cache)) for u in urls]
+        try:
+            for fut in asyncio.as_completed(tasks):
+                yield await fut
+        finally:
+            for t in tasks:
+                t.cancel()
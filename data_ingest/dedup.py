@@ -0,0 +1,227 @@
+# data_ingest/dedup.py
+"""
+Near-duplicate chunk filter for ingest: MinHash signatures over word shingles,
+banded into an LSH index, so a chunk whose estimated Jaccard similarity to an
+already-stored chunk is >= DEDUP_THRESHOLD is dropped before it is written.
+
+The index covers the whole live corpus (every site), seeded from the store, so
+boilerplate shared between MedlinePlus and CDC pages, or between overlapping
+keyword crawls, is kept once. When a page is re-ingested its previous chunks are
+removed from the index first, so a page never counts as a duplicate of itself.
+The first copy wins: deleting that page later does not bring the others back
+until they are re-crawled.
+
+After each ingest the index is saved next to the segments, one row per live
+chunk with its content hash and signature (the LSH bands are slices of it):
+
+  store/.dedup/index.npz   ids, sources, sha1 hashes, uint32 signatures, meta
+                           (MinHash parameters + the segment state it covers)
+
+If the segment state still matches, the next run loads it as-is; otherwise it
+replays the store and only signs chunks whose content hash it has not seen.
+
+  python data_ingest/dedup.py            # report duplicates in the current store
+  python data_ingest/dedup.py --apply    # ...and tombstone them
+"""
+import hashlib, json, os, re, zlib
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+try:
+    from store import SITES, SegmentStore  # run as an ingest script
+except ImportError:
+    from data_ingest.store import SITES, SegmentStore
+
+INGEST_DEDUP = os.getenv("INGEST_DEDUP", "1") == "1"
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.9"))
+
+_PRIME = (1 << 31) - 1
+_WORD_RE = re.compile(r"\w+")
+
+def _content_hash(text: str) -> str:
+    # same hash as lexical.content_hashes / app.embed_cache.content_hash
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+def store_state(store_dir) -> Dict[str, List]:
+    """Per-site [epoch, segment count]: changes whenever any segment is written or compacted."""
+    state = {}
+    for site in SITES:
+        store = SegmentStore(store_dir, site)
+        state[site] = [store.epoch, len(store.segment_paths())]
+    return state
+
+class NearDupIndex:
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, num_perm: int = 64, bands: int = 8,
+                 shingle: int = 5, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.bands, self.rows = bands, num_perm // bands
+        self.shingle = shingle
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+        self._buckets: List[Dict[bytes, List[str]]] = [defaultdict(list) for _ in range(bands)]
+        self._sigs: Dict[str, np.ndarray] = {}
+        self._hashes: Dict[str, str] = {}  # cid -> sha1 of its text, so a saved signature can be reused
+        self._source_of: Dict[str, str] = {}
+        self._by_source: Dict[str, List[str]] = defaultdict(list)
+        self.seen = self.dropped = 0
+        self.signed = 0  # chunks from_store had to sign (no saved signature for their text)
+        self.chars_seen = self.chars_dropped = 0
+
+    def signature(self, text: str) -> np.ndarray:
+        words = _WORD_RE.findall(text.lower())
+        n = max(1, len(words) - self.shingle + 1)
+        shingles = {" ".join(words[i:i + self.shingle]) for i in range(n)}
+        h = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        h %= _PRIME  # keeps a * h below 2**63
+        return ((np.outer(h, self._a) + self._b) % _PRIME).min(axis=0).astype(np.uint32)
+
+    def _bands(self, sig: np.ndarray):
+        for i in range(self.bands):
+            yield i, sig[i * self.rows:(i + 1) * self.rows].tobytes()
+
+    @property
+    def params(self) -> Dict:
+        """Everything a saved signature depends on."""
+        return {"num_perm": len(self._a), "bands": self.bands, "shingle": self.shingle,
+                "a": int(zlib.crc32(self._a.tobytes())), "b": int(zlib.crc32(self._b.tobytes()))}
+
+    def add(self, cid: str, source: str, sig: np.ndarray, content_hash: str = ""):
+        self._sigs[cid] = sig
+        self._hashes[cid] = content_hash
+        self._source_of[cid] = source
+        self._by_source[source].append(cid)
+        for i, key in self._bands(sig):
+            self._buckets[i][key].append(cid)
+
+    def remove_source(self, source: str):
+        for cid in self._by_source.pop(source, []):
+            sig = self._sigs.pop(cid, None)
+            self._hashes.pop(cid, None)
+            self._source_of.pop(cid, None)
+            if sig is None:
+                continue
+            for i, key in self._bands(sig):
+                bucket = self._buckets[i].get(key)
+                if bucket is not None:
+                    bucket[:] = [c for c in bucket if c != cid]
+                    if not bucket:
+                        del self._buckets[i][key]
+
+    def find(self, sig: np.ndarray) -> Optional[str]:
+        """Id of a stored chunk whose estimated Jaccard similarity reaches the threshold."""
+        checked = set()
+        for i, key in self._bands(sig):
+            for cid in self._buckets[i].get(key, ()):
+                if cid in checked:
+                    continue
+                checked.add(cid)
+                if float(np.mean(self._sigs[cid] == sig)) >= self.threshold:
+                    return cid
+        return None
+
+    def filter_page(self, source: str, chunks: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """Split one page's chunks into (kept, dropped); kept chunks join the index."""
+        self.remove_source(source)
+        kept, dropped = [], []
+        for rec in chunks:
+            text = rec.get("page_content", "")
+            sig = self.signature(text)
+            self.seen += 1
+            self.chars_seen += len(text)
+            if self.find(sig) is not None:
+                dropped.append(rec)
+                self.dropped += 1
+                self.chars_dropped += len(text)
+                continue
+            self.add(rec.get("id") or str(len(self._sigs)), source, sig, _content_hash(text))
+            kept.append(rec)
+        return kept, dropped
+
+    @classmethod
+    def from_store(cls, store_dir, **kwargs) -> "NearDupIndex":
+        """Index every live chunk, in corpus order, reusing the signatures saved by the last run."""
+        index = cls(**kwargs)
+        saved = index._load_saved(store_dir)
+        if saved is not None and saved["state"] == store_state(store_dir):
+            for cid, source, h, sig in saved["rows"]:
+                index.add(cid, source, sig, h)
+            return index
+        known = {h: sig for _, _, h, sig in saved["rows"]} if saved is not None else {}
+        for site in SITES:
+            for rid, rec in SegmentStore(store_dir, site).live_items().items():
+                source = (rec.get("metadata") or {}).get("source", "")
+                text = rec.get("page_content", "")
+                h = _content_hash(text)
+                sig = known.get(h)
+                if sig is None:
+                    sig = index.signature(text)
+                    index.signed += 1
+                index.add(rid, source, sig, h)
+        return index
+
+    def save(self, store_dir):
+        """Write the index for the store as it is now; call once the segment writers are closed."""
+        directory = os.path.join(str(store_dir), ".dedup")
+        os.makedirs(directory, exist_ok=True)
+        cids = list(self._sigs)
+        meta = {"params": self.params, "state": store_state(store_dir)}
+        sigs = np.stack([self._sigs[c] for c in cids]) if cids else np.zeros((0, len(self._a)), dtype=np.uint32)
+        tmp = os.path.join(directory, f"index.tmp-{os.getpid()}.npz")
+        np.savez(tmp, ids=np.array(cids, dtype=str), sources=np.array([self._source_of[c] for c in cids], dtype=str),
+                 hashes=np.array([self._hashes[c] for c in cids], dtype=str), sigs=sigs,
+                 meta=np.array(json.dumps(meta)))
+        os.replace(tmp, os.path.join(directory, "index.npz"))
+
+    def _load_saved(self, store_dir) -> Optional[Dict]:
+        try:
+            with np.load(os.path.join(str(store_dir), ".dedup", "index.npz")) as f:
+                meta = json.loads(str(f["meta"]))
+                if meta.get("params") != self.params:
+                    return None  # signed with other MinHash parameters
+                rows = list(zip(f["ids"].tolist(), f["sources"].tolist(), f["hashes"].tolist(), f["sigs"]))
+        except (OSError, ValueError, KeyError):
+            return None
+        return {"state": meta.get("state"), "rows": rows}
+
+    def summary(self) -> str:
+        pct = 100.0 * self.dropped / self.seen if self.seen else 0.0
+        return (f"{self.dropped} of {self.seen} chunks ({pct:.1f}%) were near-duplicates, "
+                f"{self.chars_dropped / 1024:.0f} KiB of {self.chars_seen / 1024:.0f} KiB text not embedded")
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Find (and optionally remove) near-duplicate chunks in the store")
+    ap.add_argument("--apply", action="store_true", help="tombstone the duplicates")
+    ap.add_argument("--threshold", type=float, default=DEDUP_THRESHOLD)
+    args = ap.parse_args()
+
+    store_dir = os.getenv("STORE_DIR", "./store")
+    index = NearDupIndex(threshold=args.threshold)
+    for site in SITES:
+        store = SegmentStore(store_dir, site)
+        pages: Dict[str, List[Dict]] = defaultdict(list)
+        for rec in store.live_items().values():
+            pages[(rec.get("metadata") or {}).get("source", "")].append(rec)
+        dropped_site = 0
+        writer = store.writer() if args.apply else None
+        for source, chunks in pages.items():
+            kept, dropped = index.filter_page(source, chunks)
+            dropped_site += len(dropped)
+            if writer is not None and dropped:
+                writer.upsert_page(source, kept)
+        if writer is not None:
+            writer.close()
+        print(f"[ok] {site}: {dropped_site} near-duplicate chunks" + (" removed" if args.apply else ""))
+    print(f"[ok] {index.summary()}")
+    if args.apply:
+        index.save(store_dir)  # it now holds exactly the live chunks
+    if args.apply and index.dropped:
+        try:
+            from lexical import build_for_store
+        except ImportError:
+            from data_ingest.lexical import build_for_store
+        build_for_store(store_dir)
@@ -0,0 +1,87 @@
+# data_ingest/fetch_cache.py
+"""
+On-disk HTTP validator cache for the crawler, keyed by normalized URL.
+
+For every page we remember ETag, Last-Modified, a hash of the body and when the
+server said it stays fresh (Cache-Control max-age or FETCH_MAX_AGE_S). A crawl then
+classifies each page as:
+  fresh        still within its freshness lifetime: not requested at all
+  revalidated  304 Not Modified, or 200 with an identical body hash
+  changed      new or different body: cleaned, chunked and upserted
+Only `changed` pages reach the parse/chunk/embed path.
+"""
+import hashlib, os, re, sqlite3, time
+from typing import Dict, Optional
+
+FETCH_MAX_AGE_S = float(os.getenv("FETCH_MAX_AGE_S", "0"))
+
+def normalize_url(url: str) -> str:
+    # strip anchors, tracking params; keep only http(s) to allowed domains
+    url = re.sub(r"#.*$", "", url)
+    url = re.sub(r"[?&]utm_[^=&]+=[^&]+", "", url)
+    return url
+
+def body_hash(content: bytes) -> str:
+    return hashlib.sha1(content).hexdigest()
+
+def _max_age(cache_control: str) -> float:
+    if "no-cache" in cache_control or "no-store" in cache_control:
+        return 0.0
+    m = re.search(r"max-age=(\d+)", cache_control)
+    return float(m.group(1)) if m else 0.0
+
+class FetchCache:
+    def __init__(self, path):
+        self.path = str(path)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT,"
+            " body_hash TEXT, fetched_at REAL, fresh_until REAL)")
+
+    def get(self, url: str) -> Optional[Dict]:
+        row = self.db.execute(
+            "SELECT etag, last_modified, body_hash, fetched_at, fresh_until FROM pages WHERE url = ?",
+            (normalize_url(url),)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("etag", "last_modified", "body_hash", "fetched_at", "fresh_until"), row))
+
+    def is_fresh(self, entry: Optional[Dict]) -> bool:
+        return entry is not None and entry["fresh_until"] > time.time()
+
+    def conditional_headers(self, entry: Optional[Dict]) -> Dict[str, str]:
+        headers = {}
+        if entry:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    @staticmethod
+    def validators(headers, digest: str, previous: Optional[Dict] = None) -> Dict:
+        """Validator record from a 200 (or a 304 refreshing `previous`)."""
+        prev = previous or {}
+        now = time.time()
+        return {
+            "etag": headers.get("ETag") or prev.get("etag"),
+            "last_modified": headers.get("Last-Modified") or prev.get("last_modified"),
+            "body_hash": digest,
+            "fetched_at": now,
+            "fresh_until": now + max(FETCH_MAX_AGE_S, _max_age(headers.get("Cache-Control", ""))),
+        }
+
+    def put(self, url: str, v: Dict):
+        self.db.execute(
+            "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)",
+            (normalize_url(url), v["etag"], v["last_modified"], v["body_hash"], v["fetched_at"], v["fresh_until"]))
+        self.db.commit()
+
+    def delete(self, url: str):
+        self.db.execute("DELETE FROM pages WHERE url = ?", (normalize_url(url),))
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
@@ -1,5 +1,5 @@
-import httpx, json, os
-from common import clean_html, chunk_text
+import os
+from pipeline import ingest, report
 from pathlib import Path
 
 PAGES = [
@@ -11,17 +11,12 @@ PAGES = [
 OUT = Path(os.getenv("STORE_DIR", "./store"))
 OUT.mkdir(parents=True, exist_ok=True)
 
+def page_title(url: str, html: str) -> str:
+    return url.split("/")[-2].replace("-", " ").title()
+
 def main():
-    docs = []
-    for url in PAGES:
-        html = httpx.get(url, timeout=30).text
-        title = url.split("/")[-2].replace("-", " ").title()
-        text = clean_html(html)
-        docs.extend(chunk_text(text, source=url, title=title))
-    with open(OUT / "cdc.jsonl", "w", encoding="utf-8") as f:
-        for d in docs:
-            f.write(json.dumps(d, ensure_ascii=False) + "\n")
-    print(f"Ingested CDC to {OUT / 'cdc.jsonl'} ({len(docs)} chunks)")
+    writers, pages = ingest(OUT, {"cdc": PAGES}, title_fn=page_title)
+    report(OUT, writers, pages)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,129 @@
+# data_ingest/lexical.py
+"""
+BM25 inverted index over chunk page_content, stored next to the corpus:
+
+  store/.lexical/terms.json     {"fingerprint": ..., "terms": [...]}
+  store/.lexical/postings.npz   CSR postings (indptr, docs, tfs) + doc lengths
+
+Rows follow the corpus order the Retriever uses (store.SITES, then segment replay),
+and the fingerprint covers every chunk's content hash in that order, so a stale
+index is detected rather than silently misaligned.
+Stdlib + numpy only, so app.rag can import it.
+"""
+import hashlib, json, os, re
+from collections import Counter
+from typing import List, Sequence, Tuple
+import numpy as np
+
+try:
+    from store import SITES, SegmentStore  # run as an ingest script
+except ImportError:
+    from data_ingest.store import SITES, SegmentStore
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i if in is it its me my of on or "
+    "should so that the their this to was what when where which who why will with you your".split())
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+def fingerprint(content_hashes: Sequence[str]) -> str:
+    h = hashlib.sha1()
+    for c in content_hashes:
+        h.update(c.encode("ascii"))
+    return h.hexdigest()
+
+def content_hashes(texts: Sequence[str]) -> List[str]:
+    # same hash as app.embed_cache.content_hash
+    return [hashlib.sha1(t.encode("utf-8")).hexdigest() for t in texts]
+
+class BM25Index:
+    def __init__(self, terms: List[str], indptr: np.ndarray, docs: np.ndarray, tfs: np.ndarray,
+                 doc_len: np.ndarray, fingerprint: str = "", k1: float = 1.2, b: float = 0.75):
+        self.vocab = {t: i for i, t in enumerate(terms)}
+        self.terms = terms
+        self.indptr, self.docs, self.tfs, self.doc_len = indptr, docs, tfs, doc_len
+        self.fingerprint = fingerprint
+        self.k1, self.b = k1, b
+        self.n_docs = len(doc_len)
+        self.avgdl = float(doc_len.mean()) if self.n_docs else 0.0
+        self.avgdl = self.avgdl or 1.0
+
+    @classmethod
+    def build(cls, texts: Sequence[str], fp: str = "") -> "BM25Index":
+        vocab, tids, docs, tfs = {}, [], [], []
+        doc_len = np.zeros(len(texts), dtype=np.float32)
+        for d, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            doc_len[d] = sum(counts.values())
+            for term, tf in counts.items():
+                tids.append(vocab.setdefault(term, len(vocab)))
+                docs.append(d)
+                tfs.append(tf)
+        tids = np.asarray(tids, dtype=np.int64)
+        order = np.argsort(tids, kind="stable")  # group by term; doc ids stay ascending
+        tids = tids[order]
+        docs = np.asarray(docs, dtype=np.int32)[order]
+        tfs = np.asarray(tfs, dtype=np.float32)[order]
+        indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.add.at(indptr, tids + 1, 1)
+        terms = [None] * len(vocab)
+        for t, i in vocab.items():
+            terms[i] = t
+        return cls(terms, np.cumsum(indptr), docs, tfs, doc_len, fp)
+
+    def save(self, directory: str):
+        # each file is replaced atomically; both carry the fingerprint so load() can tell
+        # a postings file and a terms file from different builds apart
+        os.makedirs(directory, exist_ok=True)
+        tmp = os.path.join(directory, f"postings.tmp-{os.getpid()}.npz")
+        np.savez(tmp, indptr=self.indptr, docs=self.docs, tfs=self.tfs, doc_len=self.doc_len,
+                 fingerprint=np.array(self.fingerprint))
+        os.replace(tmp, os.path.join(directory, "postings.npz"))
+        tmp = os.path.join(directory, f"terms.json.tmp-{os.getpid()}")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": self.fingerprint, "terms": self.terms}, f)
+        os.replace(tmp, os.path.join(directory, "terms.json"))
+
+    @classmethod
+    def load(cls, directory: str) -> "BM25Index":
+        with open(os.path.join(directory, "terms.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        z = np.load(os.path.join(directory, "postings.npz"))
+        if "fingerprint" in z.files and str(z["fingerprint"]) != meta["fingerprint"]:
+            raise ValueError("postings.npz and terms.json are from different builds")
+        return cls(meta["terms"], z["indptr"], z["docs"], z["tfs"], z["doc_len"], meta["fingerprint"])
+
+    def search(self, query: str, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-n (doc ids, scores) by BM25; only documents sharing a query term are touched."""
+        docs, contrib = [], []
+        for term in set(tokenize(query)):
+            tid = self.vocab.get(term)
+            if tid is None:
+                continue
+            lo, hi = self.indptr[tid], self.indptr[tid + 1]
+            d, tf = self.docs[lo:hi], self.tfs[lo:hi]
+            df = hi - lo
+            idf = np.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self.doc_len[d] / self.avgdl)
+            docs.append(d)
+            contrib.append(idf * tf * (self.k1 + 1) / (tf + norm))
+        if not docs:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        ids, inv = np.unique(np.concatenate(docs), return_inverse=True)
+        scores = np.bincount(inv, weights=np.concatenate(contrib)).astype(np.float32)
+        if n < len(ids):
+            top = np.argpartition(-scores, n - 1)[:n]
+        else:
+            top = np.arange(len(ids))
+        top = top[np.argsort(-scores[top])]
+        return ids[top].astype(np.int64), scores[top]
+
+def build_for_store(store_dir: str, directory: str = "") -> BM25Index:
+    """Build and save the index for the live corpus in store_dir (ingest-time entry point)."""
+    texts = [rec.get("page_content", "")
+             for site in SITES for rec in SegmentStore(store_dir, site).live_items().values()]
+    index = BM25Index.build(texts, fingerprint(content_hashes(texts)))
+    index.save(directory or os.path.join(str(store_dir), ".lexical"))
+    return index
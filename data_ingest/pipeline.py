@@ -0,0 +1,118 @@
+# data_ingest/pipeline.py
+"""
+Streaming ingest: fetch pages with AsyncCrawler, clean + chunk them in a process
+pool, and upsert each page into its site's segment as soon as it is ready.
+Nothing holds the whole crawl in memory; the crawler bounds how many fetched
+pages can wait for a worker. A FetchCache in the store directory makes
+re-runs skip pages that have not changed upstream, and a NearDupIndex seeded
+from the store (its saved signatures, so only new chunks are signed) drops
+near-duplicate chunks before they are written.
+"""
+import asyncio, os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Tuple
+import httpx
+
+from common import clean_html, chunk_text
+from crawler import AsyncCrawler
+from dedup import INGEST_DEDUP, NearDupIndex
+from fetch_cache import FetchCache
+from lexical import build_for_store
+from store import SegmentStore, SegmentWriter
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "0")) or (os.cpu_count() or 1)
+
+def process_page(url: str, html: str, title_fn: Optional[Callable[[str, str], str]] = None,
+                 chunk_size: int = 800, chunk_overlap: int = 120) -> Tuple[str, list]:
+    """Worker body: CPU-bound parse + chunk for one page. Must stay picklable."""
+    title = title_fn(url, html) if title_fn else url
+    text = clean_html(html)
+    return title, chunk_text(text, source=url, title=title, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+async def ingest_pages(store_dir, urls_by_site: Dict[str, Iterable[str]],
+                       title_fn: Optional[Callable[[str, str], str]] = None,
+                       workers: int = INGEST_WORKERS, concurrency: int = 8,
+                       per_domain_rps: float = 2.0, use_cache: bool = True, dedup: bool = INGEST_DEDUP
+                       ) -> Tuple[Dict[str, SegmentWriter], Dict[str, Counter]]:
+    """
+    Crawl every URL and stream its chunks into store/<site>/.
+    Returns the closed writers and per-site counts: pages by crawl status, plus
+    `chunks` produced and `duplicates` dropped by the near-duplicate filter.
+    """
+    site_of = {}
+    for site, urls in urls_by_site.items():
+        for url in urls:
+            site_of.setdefault(url, site)
+    process = partial(process_page, title_fn=title_fn)
+    cache = FetchCache(Path(store_dir) / ".fetch_cache.sqlite") if use_cache else None
+    validated, gone = [], []
+    pages = {site: Counter() for site in urls_by_site}
+    near_dups = NearDupIndex.from_store(store_dir) if dedup else None
+
+    with ExitStack() as stack:
+        # workers <= 1 keeps everything in-process (default thread executor)
+        pool = stack.enter_context(ProcessPoolExecutor(max_workers=workers)) if workers > 1 else None
+        writers = {site: stack.enter_context(SegmentStore(store_dir, site).writer()) for site in urls_by_site}
+        async with AsyncCrawler(concurrency=concurrency, per_domain_rps=per_domain_rps,
+                                executor=pool, max_pending=4 * max(workers, concurrency)) as crawler:
+            async for res in crawler.crawl(site_of, process, cache=cache):
+                site = site_of[res.url]
+                seg = writers[site]
+                pages[site][res.status] += 1
+                if res.status == "failed":
+                    err = res.value
+                    if isinstance(err, httpx.HTTPStatusError) and err.response.status_code in (404, 410):
+                        seg.delete_page(res.url)  # page is gone upstream
+                        if near_dups is not None:
+                            near_dups.remove_source(res.url)
+                        gone.append(res.url)
+                    print(f"[warn] failed {res.url}: {err}")
+                    continue
+                if res.status == "changed":
+                    _title, chunks = res.value
+                    pages[site]["chunks"] += len(chunks)
+                    if near_dups is not None:
+                        chunks, dropped = near_dups.filter_page(res.url, chunks)
+                        pages[site]["duplicates"] += len(dropped)
+                        pages[site]["duplicate_chars"] += sum(len(d.get("page_content", "")) for d in dropped)
+                    seg.upsert_page(res.url, chunks)
+                if res.validators:
+                    validated.append((res.url, res.validators))
+
+    # refresh the BM25 index for whatever is now live
+    if any(w.written or w.deleted for w in writers.values()):
+        build_for_store(store_dir)
+    if near_dups is not None:
+        near_dups.save(store_dir)  # the next run starts from these signatures
+
+    # only trust the validators once the segments they describe are published
+    if cache:
+        for url, v in validated:
+            cache.put(url, v)
+        for url in gone:
+            cache.delete(url)
+        cache.close()
+    return writers, pages
+
+def ingest(store_dir, urls_by_site: Dict[str, Iterable[str]], **kwargs):
+    return asyncio.run(ingest_pages(store_dir, urls_by_site, **kwargs))
+
+def report(store_dir, writers: Dict[str, SegmentWriter], pages: Dict[str, Counter]) -> int:
+    """Print one summary line per site; returns chunks written."""
+    total = 0
+    for site, seg in writers.items():
+        p = pages.get(site, Counter())
+        print(f"[ok] {site}: pages {p['fresh']} fresh, {p['revalidated']} revalidated, "
+              f"{p['changed']} changed, {p['failed']} failed; "
+              f"{seg.written} chunks written, {seg.unchanged} unchanged, "
+              f"{seg.deleted} removed in {Path(store_dir) / site}")
+        if p["duplicates"]:
+            print(f"[ok] {site}: dropped {p['duplicates']} of {p['chunks']} chunks as near-duplicates "
+                  f"({100.0 * p['duplicates'] / p['chunks']:.1f}% fewer, "
+                  f"{p['duplicate_chars'] / 1024:.0f} KiB text not embedded)")
+        total += seg.written
+    return total
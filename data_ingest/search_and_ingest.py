@@ -1,12 +1,13 @@
 # data_ingest/search_and_ingest.py
-import os, time, json, re
+import asyncio, os, re
 from pathlib import Path
 import httpx
 from typing import Iterable, List, Dict, Tuple
-from duckduckgo_search import DDGS
 
 # reuse your existing helpers
-from common import clean_html, chunk_text
+from crawler import UA
+from fetch_cache import normalize_url
+from pipeline import ingest_pages, report
 
 STORE_DIR = Path(os.getenv("STORE_DIR", "./store"))
 STORE_DIR.mkdir(parents=True, exist_ok=True)
@@ -16,10 +17,11 @@ DOMAINS = {
     "cdc": "cdc.gov",
 }
 
-UA = {"User-Agent": "MedicalRAGBot/0.1 (github.com/Sarayu-code/Medical-RAG-Assistant)"}
+SEARCH_CONCURRENCY = int(os.getenv("SEARCH_CONCURRENCY", "4"))  # DDG throttles aggressive clients
 
 def ddg_site_search(query: str, site: str, max_results: int = 8) -> List[Dict]:
     """DuckDuckGo site: search; returns list of dict results."""
+    from duckduckgo_search import DDGS  # only needed to search, not to ingest known URLs
     q = f"{query} site:{site}"
     results = []
     with DDGS() as ddgs:
@@ -28,77 +30,81 @@ def ddg_site_search(query: str, site: str, max_results: int = 8) -> List[Dict]:
             results.append(r)
     return results
 
-def normalize_url(url: str) -> str:
-    # strip anchors, tracking params; keep only http(s) to allowed domains
-    url = re.sub(r"#.*$", "", url)
-    url = re.sub(r"[?&]utm_[^=&]+=[^&]+", "", url)
-    return url
-
 def filter_domain(url: str, domain: str) -> bool:
     return (url.startswith("http://") or url.startswith("https://")) and (domain in url)
 
+def parse_title(html: str, url: str) -> str:
+    # quick title parse
+    m = re.search(r"<title>(.*?)</title>", html, flags=re.I | re.S)
+    return m.group(1).strip() if m else url
+
+def page_title(url: str, html: str) -> str:
+    """parse_title in the pipeline's title_fn(url, html) order; module-level so it pickles."""
+    return parse_title(html, url)
+
 def fetch_html(url: str) -> Tuple[str, str]:
-    """Return (title, html) or raise."""
+    """Return (title, html) or raise. One-off helper; bulk crawling goes through AsyncCrawler."""
     with httpx.Client(headers=UA, timeout=30.0, follow_redirects=True) as client:
         r = client.get(url)
         r.raise_for_status()
         html = r.text
-        # quick title parse
-        m = re.search(r"<title>(.*?)</title>", html, flags=re.I | re.S)
-        title = m.group(1).strip() if m else url
-        return title, html
+        return parse_title(html, url), html
 
-def ingest_from_keywords(keywords: Iterable[str], max_per_site: int = 8, sleep_s: float = 0.5) -> int:
-    """
-    For each keyword, search both sites, dedupe URLs, fetch and ingest.
-    Returns number of chunks written across both jsonl files.
-    """
-    keywords = [k.strip() for k in keywords if k and k.strip()]
-    all_urls_by_site = {k: set() for k in DOMAINS}
+async def search_urls(keywords: List[str], max_per_site: int = 8,
+                      concurrency: int = SEARCH_CONCURRENCY) -> Dict[str, set]:
+    """Run the DuckDuckGo site searches concurrently; returns {site_key: urls}."""
+    sem = asyncio.Semaphore(concurrency)
 
-    # 1) Search
-    for kw in keywords:
-        for site_key, domain in DOMAINS.items():
-            results = ddg_site_search(kw, domain, max_results=max_per_site)
-            for r in results:
-                url = normalize_url(r.get("href") or r.get("link") or "")
-                if url and filter_domain(url, domain):
-                    all_urls_by_site[site_key].add(url)
-
-    # 2) Fetch + chunk per site
-    total_chunks = 0
-    for site_key, domain in DOMAINS.items():
-        out_path = STORE_DIR / f"{site_key}.jsonl"  # medlineplus.jsonl / cdc.jsonl
-        docs = []
-        for i, url in enumerate(sorted(all_urls_by_site[site_key])):
+    async def one(kw: str, site_key: str, domain: str):
+        async with sem:
             try:
-                title, html = fetch_html(url)
-                text = clean_html(html)
-                chunks = chunk_text(text, source=url, title=title, chunk_size=800, chunk_overlap=120)
-                docs.extend(chunks)
-                time.sleep(sleep_s)  # be nice
+                return site_key, domain, await asyncio.to_thread(ddg_site_search, kw, domain, max_per_site)
             except Exception as e:
-                print(f"[warn] failed {url}: {e}")
-                continue
+                print(f"[warn] search failed for {kw!r} on {domain}: {e}")
+                return site_key, domain, []
 
-        if docs:
-            with open(out_path, "w", encoding="utf-8") as f:
-                for d in docs:
-                    f.write(json.dumps(d, ensure_ascii=False) + "\n")
-            print(f"[ok] wrote {len(docs)} chunks to {out_path}")
-            total_chunks += len(docs)
-        else:
-            print(f"[info] no docs for {site_key}")
+    all_urls_by_site = {k: set() for k in DOMAINS}
+    jobs = [one(kw, site_key, domain) for kw in keywords for site_key, domain in DOMAINS.items()]
+    for site_key, domain, results in await asyncio.gather(*jobs):
+        for r in results:
+            url = normalize_url(r.get("href") or r.get("link") or "")
+            if url and filter_domain(url, domain):
+                all_urls_by_site[site_key].add(url)
+    return all_urls_by_site
+
+async def ingest_from_keywords_async(keywords: Iterable[str], max_per_site: int = 8,
+                                     per_domain_rps: float = 2.0, concurrency: int = 8) -> int:
+    keywords = [k.strip() for k in keywords if k and k.strip()]
+
+    # 1) Search
+    all_urls_by_site = await search_urls(keywords, max_per_site)
 
-    return total_chunks
+    # 2) Fetch, then clean + chunk in worker processes, upserting page by page
+    urls_by_site = {k: sorted(v) for k, v in all_urls_by_site.items()}  # store/medlineplus/, store/cdc/
+    writers, pages = await ingest_pages(STORE_DIR, urls_by_site, title_fn=page_title,
+                                 concurrency=concurrency, per_domain_rps=per_domain_rps)
+    return report(STORE_DIR, writers, pages)
+
+def ingest_from_keywords(keywords: Iterable[str], max_per_site: int = 8, sleep_s: float = 0.5,
+                         concurrency: int = 8) -> int:
+    """
+    For each keyword, search both sites, dedupe URLs, fetch and ingest.
+    `sleep_s` is the average spacing between requests to the same domain.
+    Returns number of new or changed chunks written across both site stores.
+    """
+    rps = 1.0 / sleep_s if sleep_s > 0 else 0
+    return asyncio.run(ingest_from_keywords_async(keywords, max_per_site, per_domain_rps=rps,
+                                                  concurrency=concurrency))
 
 if __name__ == "__main__":
     import argparse
     ap = argparse.ArgumentParser()
     ap.add_argument("--keywords", type=str, required=True, help="comma-separated keywords, e.g. 'flu, fever, dehydration'")
     ap.add_argument("--max", type=int, default=8, help="max results per site per keyword")
+    ap.add_argument("--concurrency", type=int, default=8, help="max page fetches in flight")
+    ap.add_argument("--sleep", type=float, default=0.5, help="average seconds between requests per domain")
     args = ap.parse_args()
 
     kws = [k.strip() for k in args.keywords.split(",")]
-    n = ingest_from_keywords(kws, max_per_site=args.max)
+    n = ingest_from_keywords(kws, max_per_site=args.max, sleep_s=args.sleep, concurrency=args.concurrency)
     print(f"Total chunks ingested: {n}")
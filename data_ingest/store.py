@@ -0,0 +1,201 @@
+# data_ingest/store.py
+"""
+Append-only chunk store: one directory per site with a manifest of JSONL segments.
+
+  store/<site>/manifest.json   {"epoch": 0, "segments": ["seg-000000.jsonl", ...]}
+  store/<site>/seg-NNNNNN.jsonl
+
+Segment lines are either chunk records as written by common.chunk_text, or
+tombstones {"id": ..., "deleted": true}. Replaying segments in order gives the
+live corpus; later records with the same id win. Compaction rewrites the live
+set into one segment and bumps the epoch so readers know to start over.
+
+Stdlib only, so both the ingest scripts and app.rag can import it.
+Assumes one writer per site at a time.
+"""
+import hashlib, json, os, shutil
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List
+
+# corpus order used by the Retriever and every index built over the store
+SITES = ["medlineplus", "cdc"]
+
+def record_id(rec: Dict) -> str:
+    return rec.get("id") or hashlib.md5(rec.get("page_content", "").encode()).hexdigest()
+
+def _record_hash(rec: Dict) -> str:
+    return hashlib.sha1(json.dumps(rec, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+def iter_records(paths: Iterable[Path]) -> Iterator[Dict]:
+    for p in paths:
+        with open(p, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except Exception:
+                    continue
+
+def apply_record(items: "OrderedDict[str, Dict]", rec: Dict):
+    if rec.get("deleted"):
+        items.pop(rec.get("id"), None)
+    else:
+        items[record_id(rec)] = rec
+
+class SegmentStore:
+    def __init__(self, root, site: str):
+        self.root = Path(root)
+        self.site = site
+        self.dir = self.root / site
+        self.legacy = self.root / f"{site}.jsonl"  # pre-segment single-file layout
+        self.manifest_path = self.dir / "manifest.json"
+        self._pages = None  # source -> {id: record hash}; built lazily for writers
+
+    def manifest(self) -> Dict:
+        if self.manifest_path.exists():
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {"epoch": 0, "segments": []}
+
+    @property
+    def epoch(self) -> int:
+        return self.manifest().get("epoch", 0)
+
+    def segment_paths(self) -> List[Path]:
+        if self.manifest_path.exists():
+            return [self.dir / s for s in self.manifest()["segments"]]
+        return [self.legacy] if self.legacy.exists() else []
+
+    def live_items(self) -> "OrderedDict[str, Dict]":
+        items = OrderedDict()
+        for rec in iter_records(self.segment_paths()):
+            apply_record(items, rec)
+        return items
+
+    def _write_manifest(self, manifest: Dict):
+        tmp = self.manifest_path.with_suffix(".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp, self.manifest_path)
+
+    def _ensure_dir(self):
+        if self.manifest_path.exists():
+            return
+        self.dir.mkdir(parents=True, exist_ok=True)
+        segments = []
+        if self.legacy.exists():
+            # adopt the old whole-file output as the first segment
+            shutil.copyfile(self.legacy, self.dir / "seg-000000.jsonl")
+            segments.append("seg-000000.jsonl")
+        self._write_manifest({"epoch": 0, "segments": segments})
+
+    def _next_segment_name(self, manifest: Dict) -> str:
+        nums = [int(s[4:10]) for s in manifest["segments"]]
+        return f"seg-{(max(nums) + 1) if nums else 0:06d}.jsonl"
+
+    def _page_index(self) -> Dict[str, Dict[str, str]]:
+        if self._pages is None:
+            self._pages = {}
+            for rid, rec in self.live_items().items():
+                src = (rec.get("metadata") or {}).get("source", "")
+                self._pages.setdefault(src, {})[rid] = _record_hash(rec)
+        return self._pages
+
+    def writer(self) -> "SegmentWriter":
+        self._ensure_dir()
+        return SegmentWriter(self)
+
+    def compact(self) -> int:
+        """Rewrite the live set into a single segment; returns live chunk count."""
+        self._ensure_dir()
+        manifest = self.manifest()
+        items = self.live_items()
+        name = self._next_segment_name(manifest)
+        with open(self.dir / name, "w", encoding="utf-8") as f:
+            for rec in items.values():
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        old = manifest["segments"]
+        self._write_manifest({"epoch": manifest.get("epoch", 0) + 1, "segments": [name]})
+        for s in old:
+            (self.dir / s).unlink(missing_ok=True)
+        self._pages = None
+        return len(items)
+
+class SegmentWriter:
+    """Collects upserts/tombstones into one new segment, published on close."""
+
+    def __init__(self, store: SegmentStore):
+        self.store = store
+        self.name = store._next_segment_name(store.manifest())
+        self.path = store.dir / self.name
+        self.tmp_path = self.path.with_suffix(".jsonl.tmp")
+        self._f = open(self.tmp_path, "w", encoding="utf-8")
+        self.written = 0   # new or changed chunks
+        self.unchanged = 0
+        self.deleted = 0   # tombstones
+
+    def _emit(self, rec: Dict):
+        self._f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+    def upsert_page(self, source: str, chunks: List[Dict]) -> int:
+        """Replace one page's chunks, writing only what changed. Returns chunks written."""
+        pages = self.store._page_index()
+        old = pages.get(source, {})
+        new = {}
+        n = 0
+        for rec in chunks:
+            rid, h = record_id(rec), _record_hash(rec)
+            new[rid] = h
+            if old.get(rid) == h:
+                self.unchanged += 1
+                continue
+            self._emit(rec)
+            n += 1
+        for rid in old:
+            if rid not in new:
+                self._emit({"id": rid, "deleted": True})
+                self.deleted += 1
+        pages[source] = new
+        self.written += n
+        return n
+
+    def delete_page(self, source: str) -> int:
+        pages = self.store._page_index()
+        old = pages.pop(source, {})
+        for rid in old:
+            self._emit({"id": rid, "deleted": True})
+        self.deleted += len(old)
+        return len(old)
+
+    def close(self):
+        self._f.close()
+        if self.written == 0 and self.deleted == 0:
+            self.tmp_path.unlink(missing_ok=True)
+            return
+        os.replace(self.tmp_path, self.path)
+        manifest = self.store.manifest()
+        manifest["segments"].append(self.name)
+        self.store._write_manifest(manifest)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Inspect or maintain a site's segment store")
+    ap.add_argument("site", help="e.g. medlineplus or cdc")
+    ap.add_argument("--delete-page", action="append", default=[], help="tombstone every chunk of this source URL")
+    ap.add_argument("--compact", action="store_true")
+    args = ap.parse_args()
+
+    store = SegmentStore(os.getenv("STORE_DIR", "./store"), args.site)
+    if args.delete_page:
+        with store.writer() as w:
+            for url in args.delete_page:
+                print(f"[ok] {url}: {w.delete_page(url)} chunks tombstoned")
+    if args.compact:
+        print(f"[ok] compacted {args.site} to {store.compact()} live chunks")
+    print(json.dumps(store.manifest(), indent=1))
@@ -0,0 +1,21 @@
+# data_ingest/token_count.py
+"""
+Chunk token counts, computed once per chunk and stored as metadata["tokens"]; serving never
+tokenizes a query-time context. Stdlib only (plus `tokenizers` when TOKENIZER names a model),
+so app.rag can backfill chunks ingested before the counts existed.
+"""
+import os, re
+from functools import lru_cache
+
+TOKENIZER = os.getenv("TOKENIZER", "approx")  # approx | tokenizer.json path or hub name (needs `tokenizers`)
+_APPROX_TOKEN_RE = re.compile(r"\w{1,6}|[^\w\s]")  # word pieces and punctuation; errs high like a budget should
+
+@lru_cache(maxsize=1)
+def _tokenizer(name: str):
+    from tokenizers import Tokenizer
+    return Tokenizer.from_file(name) if os.path.exists(name) else Tokenizer.from_pretrained(name)
+
+def count_tokens(text: str, tokenizer: str = TOKENIZER) -> int:
+    if tokenizer == "approx":
+        return len(_APPROX_TOKEN_RE.findall(text))
+    return len(_tokenizer(tokenizer).encode(text, add_special_tokens=False).ids)
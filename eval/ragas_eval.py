@@ -1,21 +1,18 @@
-import json, os
 from datasets import Dataset
 from ragas.metrics import faithfulness, answer_relevancy
 from ragas import evaluate
-from app.rag import retriever_singleton, synthesize_answer
-from app.guardrails import instruction_prompt
-from app.rag import format_context
+from app.rag import get_retriever
 
-def load_eval(path="eval/eval_questions.jsonl"):
-    rows = []
-    with open(path, "r") as f:
-        for line in f:
-            q = json.loads(line)["query"]
-            docs = retriever_singleton.retrieve(q, k=6)
-            context = [d.page_content for d in docs]
-            answer = synthesize_answer(q, docs, instruction_prompt())
-            rows.append({"question": q, "contexts": context, "answer": answer})
-    return Dataset.from_list(rows)
+try:
+    from runner import RetrievalCache, answer_rows, load_questions, retrieve_all  # run as a script
+except ImportError:
+    from eval.runner import RetrievalCache, answer_rows, load_questions, retrieve_all
+
+def load_eval(path="eval/eval_questions.jsonl", k=6):
+    # whole file in batches, hits cached per (question, corpus version, k)
+    questions = [q["query"] for q in load_questions(path)]
+    hits = retrieve_all(get_retriever(), questions, k, RetrievalCache())
+    return Dataset.from_list(answer_rows(questions, hits))
 
 if __name__ == "__main__":
     ds = load_eval()
@@ -0,0 +1,203 @@
+# eval/runner.py
+"""
+Offline evaluation: retrieval quality and latency against a labelled question file, plus
+an answer judge.
+
+  python -m eval.runner                       # eval/eval_questions.jsonl, k=6
+  python -m eval.runner --min-recall 0.8      # exit 1 below the bar (CI)
+  python -m eval.runner --judge ragas         # external LLM judge
+
+Each line is {"query": ..., "relevant": [...]}, where `relevant` lists chunk ids or source
+URLs. Questions are retrieved in batches through Retriever.retrieve_batch and the hits are
+cached in EVAL_CACHE_PATH by (question, corpus version, k), so reruns against an unchanged
+corpus skip encoding and search; a cached question keeps the latency measured when it was
+retrieved (--no-cache to measure again).
+
+`--judge auto` uses ragas when it is installed and OPENAI_API_KEY is set, else the local
+judge: faithfulness is the share of answer sentences whose content words mostly appear in
+the contexts, answer relevancy the cosine between question and answer under the
+retriever's own encoder. Coarse, but deterministic and free.
+"""
+import argparse, hashlib, json, os, re, sqlite3, sys, time
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+import numpy as np
+
+EVAL_CACHE_PATH = os.getenv("EVAL_CACHE_PATH",
+                            os.path.join(os.getenv("STORE_DIR", "./store"), ".eval_cache.sqlite"))
+EVAL_BATCH = int(os.getenv("EVAL_BATCH", "32"))
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_SENT_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+def load_questions(path: str) -> List[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+class RetrievalCache:
+    """sqlite map of (question, corpus version, k) -> retrieved hits."""
+
+    def __init__(self, path: str = EVAL_CACHE_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS hits (key TEXT PRIMARY KEY, value TEXT)")
+
+    @staticmethod
+    def key(question: str, version: str, k: int) -> str:
+        return hashlib.sha1(json.dumps([question, version, k]).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        row = self.db.execute("SELECT value FROM hits WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, value: Dict):
+        self.db.execute("INSERT OR REPLACE INTO hits VALUES (?, ?)", (key, json.dumps(value)))
+
+def _hit(d) -> Dict:
+    m = d.metadata or {}
+    return {"id": d.id, "source": m.get("source", ""), "title": m.get("title", ""), "text": d.page_content,
+            "tokens": d.tokens}
+
+def retrieve_all(retriever, questions: List[str], k: int, cache: Optional[RetrievalCache] = None,
+                 batch_size: int = EVAL_BATCH) -> List[Dict]:
+    """{"docs", "latency_ms", "cached"} for every question, in order."""
+    out: List[Optional[Dict]] = [None] * len(questions)
+    todo = []
+    for i, q in enumerate(questions):
+        value = cache.get(cache.key(q, retriever.version, k)) if cache is not None else None
+        if value is None:
+            todo.append(i)
+        else:
+            out[i] = dict(value, cached=True)
+    for start in range(0, len(todo), batch_size):
+        idx = todo[start:start + batch_size]
+        t0 = time.perf_counter()
+        batch = retriever.retrieve_batch([questions[i] for i in idx], [k] * len(idx))
+        ms = (time.perf_counter() - t0) * 1000.0 / len(idx)  # each question's share of its batch
+        for i, docs in zip(idx, batch):
+            value = {"docs": [_hit(d) for d in docs], "latency_ms": round(ms, 3)}
+            if cache is not None:
+                cache.put(cache.key(questions[i], retriever.version, k), value)
+            out[i] = dict(value, cached=False)
+    return out
+
+def answer_rows(questions: List[str], hits: List[Dict]) -> List[Dict]:
+    """{"question", "contexts", "answer"} rows, the shape ragas expects."""
+    from app.guardrails import instruction_prompt
+    from app.rag import synthesize_answer
+    prompt = instruction_prompt()
+    rows = []
+    for q, hit in zip(questions, hits):
+        docs = [SimpleNamespace(page_content=d["text"], metadata={"title": d["title"], "source": d["source"]},
+                                tokens=d.get("tokens", len(d["text"]) // 4 + 1)) for d in hit["docs"]]
+        rows.append({"question": q, "contexts": [d["text"] for d in hit["docs"]],
+                     "answer": synthesize_answer(q, docs, prompt)})
+    return rows
+
+def score(docs: List[Dict], relevant: List[str], k: int) -> Dict:
+    """recall@k over the labels (ids or sources) and reciprocal rank of the first relevant hit."""
+    labels = set(relevant)
+    found, first = set(), 0
+    for rank, d in enumerate(docs[:k], 1):
+        match = labels & {d["id"], d["source"]}
+        if match:
+            found |= match
+            first = first or rank
+    return {f"recall@{k}": len(found) / len(labels), "rr": 1.0 / first if first else 0.0}
+
+def _content_words(text: str) -> set:
+    return {w for w in _WORD_RE.findall(text.lower()) if len(w) > 3}
+
+def local_judge(retriever, rows: List[Dict]) -> Dict[str, List[float]]:
+    faithfulness = []
+    for row in rows:
+        context = set().union(*(_content_words(c) for c in row["contexts"]))
+        sents = [w for w in (_content_words(s) for s in _SENT_RE.split(row["answer"])) if w]
+        supported = [len(w & context) / len(w) >= 0.5 for w in sents]
+        faithfulness.append(float(np.mean(supported)) if supported else 0.0)
+    q = retriever._encode([r["question"] for r in rows])
+    a = retriever._encode([r["answer"] for r in rows])
+    relevancy = np.sum(np.asarray(q) * np.asarray(a), axis=1)  # both normalized
+    return {"faithfulness": faithfulness, "answer_relevancy": [round(float(x), 4) for x in relevancy]}
+
+def ragas_judge(rows: List[Dict]) -> Dict[str, List[float]]:
+    from datasets import Dataset
+    from ragas import evaluate
+    from ragas.metrics import answer_relevancy, faithfulness
+    df = evaluate(Dataset.from_list(rows), metrics=[faithfulness, answer_relevancy]).to_pandas()
+    return {m: [float(x) for x in df[m]] for m in ("faithfulness", "answer_relevancy")}
+
+def pick_judge(kind: str) -> str:
+    if kind != "auto":
+        return kind
+    try:
+        import ragas  # noqa: F401
+    except ImportError:
+        return "local"
+    return "ragas" if os.getenv("OPENAI_API_KEY") else "local"
+
+def _mean(xs: List[float]) -> Optional[float]:
+    return round(float(np.mean(xs)), 4) if xs else None
+
+def main():
+    from app.rag import get_retriever
+
+    ap = argparse.ArgumentParser(description="Retrieval metrics and answer judging for a labelled question file")
+    ap.add_argument("--questions", default="eval/eval_questions.jsonl")
+    ap.add_argument("--k", type=int, default=6)
+    ap.add_argument("--batch", type=int, default=EVAL_BATCH)
+    ap.add_argument("--judge", choices=["auto", "local", "ragas", "none"], default="auto")
+    ap.add_argument("--no-cache", action="store_true", help="retrieve every question again")
+    ap.add_argument("--min-recall", type=float, default=0.0)
+    ap.add_argument("--min-mrr", type=float, default=0.0)
+    ap.add_argument("--out", help="also write per-question results here (JSON)")
+    args = ap.parse_args()
+
+    items = load_questions(args.questions)
+    questions = [it["query"] for it in items]
+    r = get_retriever()
+    cache = None if args.no_cache else RetrievalCache()
+    t0 = time.perf_counter()
+    hits = retrieve_all(r, questions, args.k, cache, args.batch)
+    retrieval_s = time.perf_counter() - t0
+
+    per = []
+    for it, hit in zip(items, hits):
+        row = {"query": it["query"], "latency_ms": hit["latency_ms"], "cached": hit["cached"],
+               "sources": [d["source"] for d in hit["docs"]]}
+        if it.get("relevant"):
+            row.update(score(hit["docs"], it["relevant"], args.k))
+        per.append(row)
+
+    judge = pick_judge(args.judge)
+    judged = {}
+    if judge != "none":
+        rows = answer_rows(questions, hits)
+        judged = ragas_judge(rows) if judge == "ragas" else local_judge(r, rows)
+        for metric, values in judged.items():
+            for row, v in zip(per, values):
+                row[metric] = v
+
+    labelled = [row for row in per if "rr" in row]
+    latency = np.asarray([row["latency_ms"] for row in per]) if per else np.zeros(1)
+    recall, mrr = _mean([row[f"recall@{args.k}"] for row in labelled]), _mean([row["rr"] for row in labelled])
+    summary = {
+        "questions": len(per), "labelled": len(labelled), "k": args.k, "corpus_version": r.version,
+        f"recall@{args.k}": recall, "mrr": mrr,
+        "hit_rate": _mean([float(row["rr"] > 0) for row in labelled]),
+        "latency_p50_ms": round(float(np.percentile(latency, 50)), 3),
+        "latency_p95_ms": round(float(np.percentile(latency, 95)), 3),
+        "cached": sum(row["cached"] for row in per), "retrieval_s": round(retrieval_s, 3),
+        "judge": judge, **{m: _mean(v) for m, v in judged.items()},
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary, "questions": per}, f, indent=1)
+    print(json.dumps(summary, indent=1))
+    if (recall or 0.0) < args.min_recall or (mrr or 0.0) < args.min_mrr:
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
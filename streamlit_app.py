@@ -1,4 +1,5 @@
 import os
+import json
 import base64
 import requests
 import streamlit as st
@@ -26,96 +27,123 @@ with st.form(key="ask_form", clear_on_submit=False):
     )
     submitted = st.form_submit_button("Ask")
 
+def render_disease_summary(disease_summary):
+    with st.container(border=True):
+        st.subheader(f"📋 {disease_summary.get('condition', 'Condition')} Summary")
+        
+        if disease_summary.get('overview'):
+            st.write("**Overview:**")
+            st.write(disease_summary['overview'])
+        
+        # Create columns for organized display
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            if disease_summary.get('symptoms'):
+                st.write("**Symptoms:**")
+                st.write(disease_summary['symptoms'])
+            
+            if disease_summary.get('causes'):
+                st.write("**Causes:**")
+                st.write(disease_summary['causes'])
+        
+        with col2:
+            if disease_summary.get('treatment'):
+                st.write("**Treatment:**")
+                st.write(disease_summary['treatment'])
+            
+            if disease_summary.get('prevention'):
+                st.write("**Prevention:**")
+                st.write(disease_summary['prevention'])
+
+def render_condition_pages(cps):
+    with st.container(border=True):
+        st.subheader("Condition pages")
+        if cps:
+            for cp in cps:
+                title = cp.get("title") or cp.get("provider") or "Link"
+                url = cp.get("url") or ""
+                if url:
+                    st.markdown(f"• [{title}]({url})", unsafe_allow_html=True)
+        else:
+            st.caption("No condition pages found.")
+
+def render_sources(sources):
+    if sources:
+        st.caption("Sources: " + " · ".join(f"[{s.get('title') or 'Source'}]({s.get('url')})" for s in sources if s.get("url")))
+
 if submitted:
     if not query.strip():
         st.warning("Please enter a question.")
     else:
-        with st.spinner("Thinking..."):
-            try:
-                payload = {"query": query.strip(), "top_k": top_k, "voice": voice}
-                resp = requests.post(f"{API_BASE}/ask", json=payload, timeout=60)
-            except Exception as e:
-                st.error(f"Request failed: {e}")
-                st.stop()
-
-        if not resp.ok:
-            st.error(f"Server error {resp.status_code}: {resp.text}")
-            st.stop()
+        # Placeholders in display order; /ask/stream fills them as each part is ready
+        emergency_ph = st.empty()
+        summary_ph = st.empty()
+        answer_ph = st.empty()
+        sources_ph = st.empty()
+        audio_ph = st.empty()
+        pages_ph = st.empty()
+        safety_ph = st.empty()
+        answer_ph.info("Thinking...")
 
+        payload = {"query": query.strip(), "top_k": top_k, "voice": voice}
+        got_audio = False
         try:
-            data = resp.json()
-        except Exception:
-            st.error("Could not parse JSON response from server.")
-            st.stop()
-
-        # ------------ Safety / Emergency ------------
-        safety = data.get("safety") or {}
-        if safety.get("emergency"):
-            st.error("⚠️ Potential emergency detected. If this is an emergency, call your local emergency number (e.g., 911 in the U.S.) now.")
-
-        # ------------ Disease Summary ------------
-        disease_summary = data.get("disease_summary")
-        if disease_summary:
-            with st.container(border=True):
-                st.subheader(f"📋 {disease_summary.get('condition', 'Condition')} Summary")
-                
-                if disease_summary.get('overview'):
-                    st.write("**Overview:**")
-                    st.write(disease_summary['overview'])
-                
-                # Create columns for organized display
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    if disease_summary.get('symptoms'):
-                        st.write("**Symptoms:**")
-                        st.write(disease_summary['symptoms'])
-                    
-                    if disease_summary.get('causes'):
-                        st.write("**Causes:**")
-                        st.write(disease_summary['causes'])
-                
-                with col2:
-                    if disease_summary.get('treatment'):
-                        st.write("**Treatment:**")
-                        st.write(disease_summary['treatment'])
-                    
-                    if disease_summary.get('prevention'):
-                        st.write("**Prevention:**")
-                        st.write(disease_summary['prevention'])
-
-        # ------------ Answer Card ------------
-        with st.container(border=True):
-            st.subheader("Answer")
-            st.write(data.get("answer") or "_No answer returned._")
-
-            # Audio playback (if present)
-            if voice:
-                audio_b64 = data.get("audio_b64")
-                if audio_b64:
+            with requests.post(f"{API_BASE}/ask/stream", json=payload, timeout=60, stream=True) as resp:
+                if not resp.ok:
+                    answer_ph.empty()
+                    st.error(f"Server error {resp.status_code}: {resp.text}")
+                    st.stop()
+                for raw in resp.iter_lines():
+                    if not raw:
+                        continue
                     try:
-                        audio_bytes = base64.b64decode(audio_b64)
-                        st.audio(audio_bytes, format="audio/wav")
+                        event = json.loads(raw)
                     except Exception:
-                        st.info("Audio returned but could not be decoded.")
-                else:
-                    st.caption("No audio returned. (Enable TTS in the backend or try again.)")
-
-        # ------------ Condition pages (MedlinePlus / CDC) ------------
-        with st.container(border=True):
-            st.subheader("Condition pages")
-            cps = data.get("condition_pages") or []
-            if cps:
-                for cp in cps:
-                    title = cp.get("title") or cp.get("provider") or "Link"
-                    url = cp.get("url") or ""
-                    if url:
-                        st.markdown(f"• [{title}]({url})", unsafe_allow_html=True)
-            else:
-                st.caption("No condition pages found.")
-
-        # ------------ Safety / Disclaimer ------------
-        with st.container(border=True):
-            st.subheader("Safety")
-            disclaimer = safety.get("disclaimer") or "This assistant provides general health information, not medical advice."
-            st.caption(disclaimer)
\ No newline at end of file
+                        continue
+                    kind = event.get("event")
+
+                    # ------------ Safety / Emergency + condition data (first event) ------------
+                    if kind == "safety":
+                        safety = event.get("safety") or {}
+                        if safety.get("emergency"):
+                            emergency_ph.error("⚠️ Potential emergency detected. If this is an emergency, call your local emergency number (e.g., 911 in the U.S.) now.")
+                        disease_summary = event.get("disease_summary")
+                        if disease_summary:
+                            with summary_ph.container():
+                                render_disease_summary(disease_summary)
+                        with pages_ph.container():
+                            render_condition_pages(event.get("condition_pages") or [])
+                        with safety_ph.container(border=True):
+                            st.subheader("Safety")
+                            disclaimer = safety.get("disclaimer") or "This assistant provides general health information, not medical advice."
+                            st.caption(disclaimer)
+
+                    elif kind == "sources":
+                        with sources_ph.container():
+                            render_sources(event.get("sources") or [])
+
+                    # ------------ Answer Card ------------
+                    elif kind == "answer":
+                        with answer_ph.container(border=True):
+                            st.subheader("Answer")
+                            st.write(event.get("answer") or "_No answer returned._")
+
+                    # Audio playback (if present)
+                    elif kind == "audio":
+                        audio_b64 = event.get("audio_b64")
+                        if audio_b64:
+                            got_audio = True
+                            try:
+                                audio_ph.audio(base64.b64decode(audio_b64), format="audio/wav")
+                            except Exception:
+                                audio_ph.info("Audio returned but could not be decoded.")
+
+                    elif kind == "error":
+                        answer_ph.error(f"Retrieval failed: {event.get('detail')}")
+        except Exception as e:
+            st.error(f"Request failed: {e}")
+            st.stop()
+
+        if voice and not got_audio:
+            audio_ph.caption("No audio returned. (Enable TTS in the backend or try again.)")
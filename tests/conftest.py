@@ -0,0 +1,68 @@
+import os, sys, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# app.* imports from the repo root; the ingest modules import each other by bare name
+sys.path[:0] = [ROOT, os.path.join(ROOT, "data_ingest")]
+
+class StubSite:
+    """
+    Local stand-in for a crawled site. Each path serves a queue of responses, either
+    (status, headers, body) or a callable(request_headers) returning one; the last one
+    repeats. Every request is logged as (path, request_headers, monotonic time).
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                site.requests.append((self.path, dict(self.headers), time.monotonic()))
+                queue = site.routes.get(self.path) or [(404, {}, "not found")]
+                resp = queue.pop(0) if len(queue) > 1 else queue[0]
+                status, headers, body = resp(self.headers) if callable(resp) else resp
+                data = body.encode("utf-8")
+                self.send_response(status)
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def route(self, path: str, *responses):
+        self.routes[path] = list(responses)
+        return f"{self.url}{path}"
+
+    def hits(self, path: str):
+        return [r for r in self.requests if r[0] == path]
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+@pytest.fixture
+def stub_site():
+    """Factory: each call starts another local site (its own host:port, so its own rate limit)."""
+    sites = []
+
+    def make() -> StubSite:
+        sites.append(StubSite())
+        return sites[-1]
+
+    yield make
+    for s in sites:
+        s.close()
@@ -0,0 +1,48 @@
+import asyncio, threading
+
+import pytest
+
+from app import api
+from app.metrics import STAGE_SECONDS
+from app.schemas import AskBatchRequest, AskRequest
+
+def _tts_samples() -> int:
+    row = STAGE_SECONDS._values.get(("tts",))
+    return row[-1] if row else 0
+
+class _NoRetrieval:
+    async def submit(self, item):
+        return [], {"batch_size": 1}
+
+@pytest.mark.parametrize("voice", [False, True])
+def test_tts_stage_only_recorded_when_voice_requested(monkeypatch, voice):
+    monkeypatch.setattr(api, "batcher", _NoRetrieval())
+    req = AskRequest(query="what are flu symptoms", voice=voice, debug=True)
+    before = _tts_samples()
+    out = asyncio.run(api._ask(req))
+    assert ("tts" in out["debug"]["timings_ms"]) is voice
+    assert _tts_samples() - before == int(voice)
+    assert (out["audio_b64"] is not None) is voice
+
+def test_ask_speaks_off_the_event_loop(monkeypatch):
+    monkeypatch.setattr(api, "batcher", _NoRetrieval())
+    spoken = []
+
+    def tts(text):
+        spoken.append(threading.current_thread())
+        return "audio"
+
+    monkeypatch.setattr(api, "dummy_tts", tts)
+    out = asyncio.run(api._ask(AskRequest(query="what are flu symptoms", voice=True)))
+    assert out["audio_b64"] == "audio"
+    assert spoken and spoken[0] is not threading.main_thread()
+
+def test_ask_batch_speaks_only_voice_requests(monkeypatch):
+    class Retriever:
+        def retrieve_batch(self, queries, ks):
+            return [[] for _ in queries]
+
+    monkeypatch.setattr(api, "get_retriever", Retriever)
+    out = api.ask_batch(AskBatchRequest(requests=[
+        AskRequest(query="flu", voice=True), AskRequest(query="flu", voice=False)]))
+    assert [o["audio_b64"] is not None for o in out] == [True, False]
@@ -0,0 +1,51 @@
+import pytest
+
+from app import condition_links
+from app.condition_links import ConditionKB, match_disease
+
+@pytest.mark.parametrize("text", ["strike", "stoke", "a strike at work", "i had a stoke of luck"])
+def test_short_words_are_not_typo_corrected(text):
+    assert match_disease(text) is None
+
+def test_exact_keywords_still_match():
+    assert match_disease("signs of a stroke") == "stroke"
+
+@pytest.mark.parametrize("text", ["diabetis", "do i have diabetis"])
+def test_long_words_tolerate_typos(text):
+    assert match_disease(text) == "diabetes"
+
+@pytest.mark.parametrize("text", ["influence", "migrating", "hard attack", "heart stack", "my heart stack overflowed"])
+def test_ordinary_words_are_not_typo_corrected(text):
+    assert match_disease(text) is None
+
+def test_edit_limit():
+    kb = ConditionKB({"a": {"keywords": ["abcdefgh"]}})
+    assert kb.match(["abcdefgx"]) == "a"
+    assert kb.match(["abcdefxx"]) is None  # one edit at most, however long the phrase
+    kb = ConditionKB({"b": {"keywords": ["abcdefg"]}})
+    assert kb.match(["abcdefx"]) == "b"
+    assert kb.match(["abxdefx"]) is None
+
+def test_known_words_are_not_corrected():
+    kb = ConditionKB({"a": {"keywords": ["abcdefgh"], "overview": "see abcdefgx"}})
+    assert kb.match(["abcdefgx"]) is None  # appears in the conditions' own text
+    kb = ConditionKB({"a": {"keywords": ["abcdefgh"]}})
+    kb.add_vocabulary(["abcdefgx"])  # corpus vocabulary
+    assert kb.match(["abcdefgx"]) is None
+    assert kb.match(["abcdefgy"]) == "a"
+
+def test_candidate_needs_trigram_overlap(monkeypatch):
+    monkeypatch.setattr(condition_links, "FUZZY_MAX_EDITS", 2)
+    kb = ConditionKB({"a": {"keywords": ["abcdefgh"]}})
+    assert kb.match(["abcdefxx"]) == "a"
+    # two edits, but they leave only 3 of the phrase's 10 trigrams in common
+    assert kb.match(["abxdefxh"]) is None
+
+def test_common_trigram_buckets_are_skipped():
+    # thousands of same-length keywords sharing a prefix fill their buckets past the cap;
+    # a distinctive keyword next to them is still found
+    conditions = {f"c{i}": {"keywords": [f"zzzzz{i:05d}"]} for i in range(3000)}
+    conditions["zephyritis"] = {"keywords": ["zephyritis"]}
+    kb = ConditionKB(conditions)
+    assert kb.match(["zephiritis"]) == "zephyritis"
+    assert kb.match(["zzzzz01234"]) == "c1234"  # exact lookups are unaffected
@@ -0,0 +1,66 @@
+import asyncio, time
+
+from crawler import AsyncCrawler
+from pipeline import ingest
+from store import SegmentStore
+
+PAGE = "<html><head><title>Fever</title></head><body><p>A fever is a body temperature above normal.</p></body></html>"
+
+def _crawl(urls, **kwargs):
+    async def run():
+        async with AsyncCrawler(**kwargs) as crawler:
+            return [r async for r in crawler.crawl(urls, lambda url, html: html)]
+    return asyncio.run(run())
+
+def test_etag_then_304_revalidation(tmp_path, stub_site):
+    site = stub_site()
+
+    def page(headers):
+        if headers.get("If-None-Match") == '"v1"':
+            return 304, {"ETag": '"v1"'}, ""
+        return 200, {"ETag": '"v1"', "Content-Type": "text/html"}, PAGE
+
+    url = site.route("/fever.html", page)
+    _, first = ingest(tmp_path, {"medlineplus": [url]}, workers=1)
+    _, second = ingest(tmp_path, {"medlineplus": [url]}, workers=1)
+
+    assert first["medlineplus"]["changed"] == 1
+    assert second["medlineplus"]["revalidated"] == 1 and second["medlineplus"]["changed"] == 0
+    assert site.hits("/fever.html")[1][1].get("If-None-Match") == '"v1"'
+
+def test_retries_a_503(stub_site):
+    site = stub_site()
+    url = site.route("/flaky.html", (503, {}, "busy"), (200, {}, PAGE))
+    [res] = _crawl([url], per_domain_rps=0, backoff_s=0.01)
+    assert res.status == "changed" and res.value == PAGE
+    assert len(site.hits("/flaky.html")) == 2
+
+def test_404_tombstones_the_page(tmp_path, stub_site):
+    site = stub_site()
+    url = site.route("/gone.html", (200, {}, PAGE), (404, {}, "not found"))
+    ingest(tmp_path, {"medlineplus": [url]}, workers=1, use_cache=False)
+    store = SegmentStore(tmp_path, "medlineplus")
+    assert store.live_items()
+
+    _, pages = ingest(tmp_path, {"medlineplus": [url]}, workers=1, use_cache=False)
+    assert pages["medlineplus"]["failed"] == 1
+    assert not store.live_items()
+    last = [line for line in open(store.segment_paths()[-1], encoding="utf-8") if line.strip()]
+    assert all('"deleted": true' in line for line in last)
+
+def test_rate_limit_is_per_domain(stub_site):
+    a, b = stub_site(), stub_site()
+    urls = [s.route(f"/p{i}.html", (200, {}, PAGE)) for s in (a, b) for i in range(6)]
+    t0 = time.monotonic()
+    results = _crawl(urls, concurrency=2, per_domain_rps=2, burst=2)
+    elapsed = time.monotonic() - t0
+
+    assert all(r.status == "changed" for r in results)
+    # each host: 2 burst requests, then 4 more at 2/s, about 2 s; hosts run side by side
+    done = [max(t for _, _, t in s.requests) - t0 for s in (a, b)]
+    assert max(done) < 3.0, done
+    assert abs(done[0] - done[1]) < 1.0, done
+    for s in (a, b):
+        times = sorted(t for _, _, t in s.requests)
+        assert times[-1] - times[0] >= 1.8  # the limit itself still holds
+    assert elapsed < 3.5
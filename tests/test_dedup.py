@@ -0,0 +1,57 @@
+import numpy as np
+
+import dedup
+from dedup import NearDupIndex
+from store import SegmentStore
+
+def _chunks(source, texts):
+    return [{"id": f"{source}#{i}", "page_content": t, "metadata": {"source": source, "chunk_id": i}}
+            for i, t in enumerate(texts)]
+
+def _text(i):
+    return " ".join(f"word{i}-{j}" for j in range(40))
+
+def _ingest(store_dir, index, pages):
+    with SegmentStore(store_dir, "medlineplus").writer() as w:
+        for source, texts in pages.items():
+            kept, _ = index.filter_page(source, _chunks(source, texts))
+            w.upsert_page(source, kept)
+    index.save(store_dir)
+
+def test_saved_index_is_reused_without_signing(tmp_path, monkeypatch):
+    _ingest(tmp_path, NearDupIndex.from_store(tmp_path), {"a": [_text(0), _text(1)], "b": [_text(2)]})
+
+    calls = []
+    monkeypatch.setattr(NearDupIndex, "signature", lambda self, text: calls.append(text))
+    index = NearDupIndex.from_store(tmp_path)
+    assert not calls and index.signed == 0
+    assert sorted(index._sigs) == ["a#0", "a#1", "b#0"]
+
+def test_stale_index_only_signs_new_chunks(tmp_path):
+    _ingest(tmp_path, NearDupIndex.from_store(tmp_path), {"a": [_text(0), _text(1)]})
+    # another writer (dedup off) adds a page and moves one chunk; the saved index no longer matches
+    with SegmentStore(tmp_path, "cdc").writer() as w:
+        w.upsert_page("c", _chunks("c", [_text(1), _text(3)]))
+
+    index = NearDupIndex.from_store(tmp_path)
+    assert index.signed == 1  # only _text(3) is new content
+    fresh = NearDupIndex()
+    for cid, sig in index._sigs.items():
+        np.testing.assert_array_equal(sig, fresh.signature(
+            {"a#0": _text(0), "a#1": _text(1), "c#0": _text(1), "c#1": _text(3)}[cid]))
+    assert index.find(fresh.signature(_text(3))) == "c#1"
+
+def test_other_minhash_parameters_discard_the_saved_index(tmp_path):
+    _ingest(tmp_path, NearDupIndex.from_store(tmp_path), {"a": [_text(0)]})
+    assert NearDupIndex.from_store(tmp_path, seed=2).signed == 1
+    assert NearDupIndex.from_store(tmp_path).signed == 0
+
+def test_pipeline_saves_the_index(tmp_path, stub_site):
+    from pipeline import ingest
+    site = stub_site()
+    url = site.route("/p.html", (200, {}, f"<html><body><p>{_text(5)}</p></body></html>"))
+    ingest(tmp_path, {"medlineplus": [url]}, workers=1, use_cache=False)
+    assert (tmp_path / ".dedup" / "index.npz").exists()
+    index = NearDupIndex.from_store(tmp_path)
+    assert index.signed == 0 and len(index._sigs) == len(SegmentStore(tmp_path, "medlineplus").live_items())
+    assert dedup.store_state(tmp_path)["medlineplus"][1] == 1
@@ -0,0 +1,34 @@
+import os
+
+import numpy as np
+import pytest
+
+from app.docstore import ColumnarDocStore
+
+RECORDS = [("medlineplus", {"id": f"d{i}", "page_content": f"chunk {i}", "metadata": {"chunk_id": i, "tokens": 3}})
+           for i in range(4)]
+
+def _emb(tmp_path, name):
+    path = os.path.join(tmp_path, name)
+    np.save(path, np.ones((len(RECORDS), 2), dtype=np.float32))
+    return path
+
+def test_published_generations_are_never_rewritten(tmp_path):
+    root = str(tmp_path / "docstore")
+    old = ColumnarDocStore.build(root, iter(RECORDS), {"medlineplus": [0, 1]})
+    meta_path = os.path.join(old.path, "meta.json")
+    before = open(meta_path, "rb").read()
+    with pytest.raises(RuntimeError):
+        old.attach_embeddings("m", _emb(tmp_path, "a.npy"), fingerprint="fp")
+
+    new = old.fork()
+    assert ColumnarDocStore.current_name(root) == old.name  # forking does not publish
+    new.attach_embeddings("m", _emb(tmp_path, "b.npy"), fingerprint="fp")
+    new.publish()
+
+    assert open(meta_path, "rb").read() == before
+    assert old.embeddings("m") is None and old.text(2) == "chunk 2"
+    current = ColumnarDocStore.open(root)
+    assert current.name == new.name and current.generation == old.generation + 1
+    assert current.embeddings("m")[1]["fingerprint"] == "fp"
+    assert [current.record(i) for i in range(len(current))] == [old.record(i) for i in range(len(old))]
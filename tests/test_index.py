@@ -0,0 +1,43 @@
+import os, subprocess, sys
+
+import numpy as np
+import pytest
+
+from app.index import ExactIndex, ShardedIndex
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+N, D = 101, 16  # no shard count below divides 101
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    embs = rng.standard_normal((N, D)).astype(np.float32)
+    embs /= np.linalg.norm(embs, axis=1, keepdims=True)
+    queries = rng.standard_normal((7, D)).astype(np.float32)
+    return embs, queries
+
+@pytest.mark.parametrize("shards", [1, 2, 3, 7, 8])
+@pytest.mark.parametrize("k", [1, 10, 40, N, N + 5])  # 40 is more than any of the 3+ shards holds
+def test_sharded_matches_exact(data, shards, k):
+    embs, queries = data
+    index = ShardedIndex(embs, shards)
+    assert len(index.shards) == shards
+    assert sum(len(s) for s in index.shards) == N
+    want_scores, want_ids = ExactIndex(embs).search(queries, k)
+    got_scores, got_ids = index.search(queries, k)
+    assert got_ids.shape == want_ids.shape == (len(queries), min(k, N))
+    np.testing.assert_array_equal(got_ids, want_ids)
+    np.testing.assert_allclose(got_scores, want_scores, rtol=1e-5, atol=1e-6)
+
+def test_more_shards_than_rows(data):
+    embs, queries = data
+    index = ShardedIndex(embs[:3], 8)
+    assert len(index.shards) == 3
+    _, ids = index.search(queries, 10)
+    assert sorted(ids[0].tolist()) == [0, 1, 2]
+
+def test_exact_and_sharded_never_import_faiss():
+    code = ("import sys, numpy as np; from app import rag; from app.index import load_or_build; "
+            "e = np.eye(4, dtype=np.float32); load_or_build('exact', e, '', ''); load_or_build('sharded', e, '', ''); "
+            "assert 'faiss' not in sys.modules")
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=ROOT)
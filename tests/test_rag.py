@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from app import index, rag
+
+@pytest.mark.parametrize("name, value", [
+    ("EMB_PRECISION", "int8"), ("RESCORE_FACTOR", 9), ("IVF_NLIST", 77), ("IVF_NPROBE", 32),
+    ("HNSW_M", 7), ("HNSW_EF_CONSTRUCTION", 301), ("HNSW_EF_SEARCH", 256)])
+def test_version_changes_with_search_settings(monkeypatch, name, value):
+    before = rag.retrieval_version("fp")
+    monkeypatch.setattr(index, name, value)
+    assert rag.retrieval_version("fp") != before
+
+@pytest.mark.parametrize("name", ["RETRIEVAL_MODE", "LEXICAL_CANDIDATES", "HYBRID_DEPTH", "CONTEXT_TOKEN_BUDGET"])
+def test_version_changes_with_rag_settings(monkeypatch, name):
+    before = rag.retrieval_version("fp")
+    monkeypatch.setattr(rag, name, "changed")
+    assert rag.retrieval_version("fp") != before
+
+def test_version_is_stable_for_same_settings():
+    assert rag.retrieval_version("fp") == rag.retrieval_version("fp")
+    assert rag.retrieval_version("fp") != rag.retrieval_version("other")
+
+class _RecordingEncoder:
+    def __init__(self):
+        self.seen = []
+
+    def encode(self, texts, normalize_embeddings=True):
+        self.seen.append(list(texts))
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+def test_queries_are_encoded_as_typed_and_cached_normalized():
+    r = rag.Retriever(load=False)
+    r.emb = _RecordingEncoder()
+    vecs = r.embed_queries(["What is HIV?", "what is  hiv", "COVID-19 symptoms"])
+    assert vecs.shape == (3, 4)
+    assert r.emb.seen == [["What is HIV?", "COVID-19 symptoms"]]  # one encode per cache key
+    r.embed_queries(["WHAT IS HIV"])
+    assert len(r.emb.seen) == 1  # normalized key hits the cache
+
+def test_chunks_stored_without_token_counts_are_backfilled(tmp_path):
+    from data_ingest.store import SITES, SegmentStore
+    from data_ingest.token_count import count_tokens
+    with SegmentStore(tmp_path, "medlineplus").writer() as w:
+        w.upsert_page("u", [{"id": "a", "page_content": "Flu symptoms: fever, cough.", "metadata": {"source": "u"}},
+                            {"id": "b", "page_content": "x", "metadata": {"source": "u", "tokens": 7}}])
+    stores = {site: SegmentStore(tmp_path, site) for site in SITES}
+    state = {site: [st.epoch, len(st.segment_paths())] for site, st in stores.items()}
+    paths = {site: st.segment_paths() for site, st in stores.items()}
+    records = [rec for _, rec in rag.Retriever(load=False)._records(state, paths, None)]
+    assert [r["metadata"]["tokens"] for r in records] == [count_tokens("Flu symptoms: fever, cough."), 7]
@@ -0,0 +1,20 @@
+from pipeline import ingest
+from store import SegmentStore
+
+PAGE = "<html><head><title>Flu</title></head><body><p>Flu symptoms include fever and cough.</p></body></html>"
+
+def test_keyword_ingest_titles_come_from_the_title_tag(tmp_path, stub_site, monkeypatch):
+    monkeypatch.setenv("STORE_DIR", str(tmp_path))
+    from search_and_ingest import page_title
+
+    site = stub_site()
+    url = site.route("/flu.html", (200, {"Content-Type": "text/html"}, PAGE))
+    ingest(tmp_path, {"medlineplus": [url]}, title_fn=page_title, workers=1, use_cache=False, dedup=False)
+
+    chunks = list(SegmentStore(tmp_path, "medlineplus").live_items().values())
+    assert chunks
+    assert {c["metadata"]["title"] for c in chunks} == {"Flu"}
+
+def test_page_title_falls_back_to_url():
+    from search_and_ingest import page_title
+    assert page_title("https://x/flu.html", "<html><body>no title</body></html>") == "https://x/flu.html"